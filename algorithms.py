@@ -1,13 +1,17 @@
 # algorithms.py
 import random
 from datetime import datetime
+from collections import Counter
 import copy
-from heapq import heappush, heappop
+from heapq import nlargest
+from task import EMOTION_ID, RESOURCE_ID, get_bits
 
 # ==============================================
 # SMARTER CSP WITH MRV AND DEGREE HEURISTIC
 # ==============================================
 
+_UNASSIGNED = object()  # Marks an unassigned slot in an assignment list
+
 class CSP:
     """
     Constraint Satisfaction Problem Solver
@@ -19,60 +23,75 @@ class CSP:
         self.conditions = current_conditions or {}
         self.variables = [task.name for task in tasks]
         self.domains = {task.name: [True, False] for task in tasks}  # True=recommend, False=don't recommend
-        self.constraints = []
+        self.constraints = []  # Extra constraint functions (assignment, variable id, value)
         self.task_map = {task.name: task for task in tasks}
+        self.emotion_bit = get_bits(EMOTION_ID, [emotion])
+        
+        # Variables are numbered by position so an assignment is a plain
+        # list (indexed by variable id) rather than a dict keyed by name
+        self.var_id = {name: i for i, name in enumerate(self.variables)}
+        self.n = len(self.variables)
+        
+        # Time and resource checks depend only on the task and the fixed
+        # conditions, so evaluate them once per solve
+        current_time = self.conditions.get("current_time") or datetime.now()
+        self.time_ok = [task.is_time_suitable(current_time) for task in tasks]
+        self.resources_ok = [task.check_constraints(self.conditions, current_time) for task in tasks]
         
         # Add constraints
+        self.check_emotion = False
+        self.check_resources = False
+        self.check_time = False
         self.add_emotion_constraint()
         self.add_resource_constraint()
         self.add_time_constraint()
+        
+        # Constraints only look at the variable being assigned, so the legal
+        # values of each variable can be worked out once up front
+        empty = [_UNASSIGNED] * self.n
+        self.legal_values = [
+            [value for value in [True, False]
+             if self.check_value(i, value)
+             and all(constraint(empty, i, value) for constraint in self.constraints)]
+            for i in range(self.n)
+        ]
     
     def add_emotion_constraint(self):
         """Constraint: Task must match current emotion"""
-        def constraint(assignment, variable, value):
-            if value:  # If we're recommending this task
-                task = self.task_map[variable]
-                return self.emotion in task.emotion_fit
-            return True  # It's okay to not recommend any task
-        
-        self.constraints.append(constraint)
+        self.check_emotion = True
     
     def add_time_constraint(self):
         """Constraint: Task must be time-appropriate"""
-        def constraint(assignment, variable, value):
-            if value:  # If we're recommending this task
-                task = self.task_map[variable]
-                current_time = self.conditions.get("current_time", datetime.now())
-                return task.is_time_suitable(current_time)
-            return True
-        
-        self.constraints.append(constraint)
+        self.check_time = True
     
     def add_resource_constraint(self):
         """Constraint: Must have required resources"""
-        def constraint(assignment, variable, value):
-            if value:  # If we're recommending this task
-                task = self.task_map[variable]
-                return task.check_constraints(self.conditions)
-            return True
+        self.check_resources = True
+    
+    def check_value(self, variable, value):
+        """Apply the built-in emotion, resource and time constraints in one test"""
+        if not value:
+            return True  # It's okay to not recommend any task
         
-        self.constraints.append(constraint)
+        # If we're recommending this task
+        return ((not self.check_emotion or bool(self.tasks[variable].emotion_fit_bits & self.emotion_bit))
+                and (not self.check_resources or self.resources_ok[variable])
+                and (not self.check_time or self.time_ok[variable]))
     
-    def mrv_heuristic(self, assignment):
+    def mrv_heuristic(self, assignment, domains=None):
         """Minimum Remaining Values: Choose variable with fewest legal values"""
-        unassigned = [var for var in self.variables if var not in assignment]
+        unassigned = [i for i in range(self.n) if assignment[i] is _UNASSIGNED]
         
         if not unassigned:
             return None
         
+        if domains is None:
+            domains = self.legal_values
+        
         # Calculate remaining values for each unassigned variable
         mrv_scores = []
         for variable in unassigned:
-            legal_values = 0
-            for value in self.domains[variable]:
-                if self.is_consistent(assignment, variable, value):
-                    legal_values += 1
-            mrv_scores.append((legal_values, variable))
+            mrv_scores.append((len(domains[variable]), variable))
         
         # Return variable with minimum remaining values
         min_legal, best_var = min(mrv_scores, key=lambda x: x[0])
@@ -80,35 +99,32 @@ class CSP:
     
     def degree_heuristic(self, assignment):
         """Degree Heuristic: Choose variable with most constraints on remaining variables"""
-        unassigned = [var for var in self.variables if var not in assignment]
+        unassigned = [i for i in range(self.n) if assignment[i] is _UNASSIGNED]
         
         if not unassigned:
             return None
         
+        # Look up each variable's time suitability and requirement once
+        now = datetime.now()
+        time_ok = {var: self.tasks[var].is_time_suitable(now) for var in unassigned}
+        req_of = {var: self.tasks[var].constraints.get("requires", "") for var in unassigned}
+        
         # Calculate degree for each unassigned variable
         degree_scores = []
         for variable in unassigned:
             degree = 0
-            task1 = self.task_map[variable]
             
             # Check constraints with other unassigned variables
             for other_var in unassigned:
                 if variable != other_var:
-                    task2 = self.task_map[other_var]
-                    
                     # Check if tasks share constraints
                     # 1. Time constraints
-                    time1_ok = task1.is_time_suitable(datetime.now())
-                    time2_ok = task2.is_time_suitable(datetime.now())
-                    if not time1_ok and not time2_ok:
+                    if not time_ok[variable] and not time_ok[other_var]:
                         degree += 1
                     
                     # 2. Resource constraints
-                    if hasattr(task1, 'constraints') and hasattr(task2, 'constraints'):
-                        req1 = task1.constraints.get("requires", "")
-                        req2 = task2.constraints.get("requires", "")
-                        if req1 and req2 and req1 == req2:
-                            degree += 1
+                    if req_of[variable] and req_of[variable] == req_of[other_var]:
+                        degree += 1
             
             degree_scores.append((degree, variable))
         
@@ -118,45 +134,118 @@ class CSP:
     
     def is_consistent(self, assignment, variable, value):
         """Check if assignment is consistent with all constraints"""
-        # Create temporary assignment
-        temp_assignment = assignment.copy()
-        temp_assignment[variable] = value
+        # Values ruled out up front can never become consistent
+        if value not in self.legal_values[variable]:
+            return False
         
-        # Check all constraints
-        for constraint in self.constraints:
-            if not constraint(temp_assignment, variable, value):
-                return False
+        # The built-in constraints are already folded into the legal values
+        if not self.constraints:
+            return True
         
+        # Tentatively assign in place instead of copying the assignment, and
+        # put back whatever was there before once the constraints are checked
+        previous = assignment[variable]
+        assignment[variable] = value
+        try:
+            # Check all constraints
+            for constraint in self.constraints:
+                if not constraint(assignment, variable, value):
+                    return False
+            
+            return True
+        finally:
+            assignment[variable] = previous
+    
+    def forward_check(self, assignment, domains, trail):
+        """Prune values of unassigned variables that are no longer consistent.
+        
+        Every removed value is recorded on the trail so it can be restored on
+        backtrack. Returns False if some variable is left with no values.
+        """
+        for other in range(self.n):
+            if assignment[other] is not _UNASSIGNED:
+                continue
+            for value in list(domains[other]):
+                if not self.is_consistent(assignment, other, value):
+                    domains[other].remove(value)
+                    trail.append((other, value))
+            if not domains[other]:
+                return False
         return True
     
+    def restore_domains(self, domains, trail, mark):
+        """Undo domain pruning back to the given trail length"""
+        while len(trail) > mark:
+            variable, value = trail.pop()
+            remaining = domains[variable]
+            # Keep the original value order (True first, then False)
+            domains[variable] = [v for v in self.legal_values[variable]
+                                 if v == value or v in remaining]
+    
     def backtrack(self, assignment):
-        """Backtracking search with heuristics"""
-        # If all variables assigned, return assignment
-        if len(assignment) == len(self.variables):
-            return assignment
+        """Iterative backtracking search with heuristics and forward checking"""
+        self.current_domains = copy.deepcopy(self.legal_values)
+        domains = self.current_domains
         
-        # Select variable using MRV, tie-break with Degree Heuristic
-        var = self.mrv_heuristic(assignment)
+        # A variable with no legal values can never be assigned
+        if not all(domains):
+            return None
         
-        # If MRV didn't find a variable (shouldn't happen), use Degree Heuristic
-        if var is None:
-            var = self.degree_heuristic(assignment)
+        trail = []  # (variable, removed_value) entries for undoing pruning
+        stack = []  # (variable, values left to try, trail length on entry)
         
-        # Try values in order (True first, then False)
-        for value in [True, False]:
-            if self.is_consistent(assignment, var, value):
-                assignment[var] = value
-                result = self.backtrack(assignment)
-                if result is not None:
-                    return result
-                del assignment[var]
+        def push_next_variable():
+            # Select variable using MRV, tie-break with Degree Heuristic
+            var = self.mrv_heuristic(assignment, domains)
+            
+            # If MRV didn't find a variable (shouldn't happen), use Degree Heuristic
+            if var is None:
+                var = self.degree_heuristic(assignment)
+            
+            if var is None:
+                return False  # All variables assigned
+            
+            # Try values in order (True first, then False)
+            stack.append((var, iter(list(domains[var])), len(trail)))
+            return True
+        
+        if not push_next_variable():
+            return assignment
+        
+        while stack:
+            var, values, mark = stack[-1]
+            
+            # Undo whatever the previously tried value of this variable did
+            self.restore_domains(domains, trail, mark)
+            assignment[var] = _UNASSIGNED
+            
+            value = next(values, None)
+            if value is None:
+                stack.pop()  # Exhausted, backtrack to the previous variable
+                continue
+            
+            if not self.is_consistent(assignment, var, value):
+                continue
+            
+            assignment[var] = value
+            if not self.forward_check(assignment, domains, trail):
+                continue  # Domain wipeout, try the next value
+            
+            if not push_next_variable():
+                return assignment
         
         return None  # No solution
     
     def solve(self):
         """Solve CSP and return recommended tasks and warnings"""
-        assignment = {}
-        solution = self.backtrack(assignment)
+        if self.constraints:
+            assignment = [_UNASSIGNED] * self.n
+            solution = self.backtrack(assignment)
+        else:
+            # The built-in constraints are unary, so the variables are
+            # independent and the search would just recommend every task
+            # that may be recommended; read that straight off the legal values
+            solution = [True in values for values in self.legal_values]
         
         if solution is None:
             return [], ["CSP could not find a solution"]
@@ -165,18 +254,18 @@ class CSP:
         recommended_tasks = []
         warnings = []
         
-        for task_name, recommended in solution.items():
-            if recommended:  # If task is recommended
-                task = self.task_map[task_name]
+        for i, recommended in enumerate(solution):
+            if recommended is True:  # If task is recommended
+                task = self.tasks[i]
                 recommended_tasks.append(task)
                 
-                # Check for warnings
-                current_time = self.conditions.get("current_time", datetime.now())
-                if not task.is_time_suitable(current_time):
+                # Enforced constraints already rule these out, so only warn
+                # about the ones that were switched off
+                if not self.check_time and not self.time_ok[i]:
                     warnings.append(f"{task.name}: Task may not be suitable for current time")
                 
                 # Check resource constraints
-                if not task.check_constraints(self.conditions):
+                if not self.check_resources and not self.resources_ok[i]:
                     required = task.constraints.get("requires", "")
                     if required:
                         warnings.append(f"{task.name}: Requires {required}")
@@ -187,6 +276,24 @@ class CSP:
 # NEW CSP FUNCTIONS FOR CS PROJECT
 # ==============================================
 
+# Hours of the day at which each named preferred_time is valid ("any" and
+# unknown names are always valid)
+PREFERRED_TIME_HOURS = {
+    "morning": frozenset(range(6, 12)),
+    "afternoon": frozenset(range(12, 17)),
+    "evening": frozenset(range(17, 22)),
+    "daylight": frozenset(range(7, 18)),
+    "night": frozenset(list(range(19, 24)) + list(range(0, 5))),
+}
+
+# Deadline urgency categories, most urgent first
+URGENCY_LEVELS = ("overdue", "due_today", "due_tomorrow", "due_week", "due_later")
+
+# Task categories used to pick mood-improving vs productive tasks
+MOOD_CATEGORIES = frozenset(["break", "personal", "life", "mood_enhancer", "user_preference"])
+WORK_CATEGORIES = frozenset(["academic", "work", "todo_must"])
+PREFERENCE_CATEGORIES = frozenset(["user_preference", "mood_enhancer"])
+
 def csp_task(tasks, current_time=None):
     """
     CSP function that constraints based on deadline.
@@ -207,71 +314,62 @@ def csp_task(tasks, current_time=None):
         return None, "No tasks have deadlines set", "none"
     
     # Parse deadlines and calculate urgency
-    from datetime import datetime
     if current_time is None:
         current_time = datetime.now()
     
-    urgency_categories = {
-        "overdue": [],
-        "due_today": [],
-        "due_tomorrow": [],
-        "due_week": [],
-        "due_later": []
-    }
+    # Deadlines are at midnight, so once the current day has started the
+    # whole-day difference is one less (same as (deadline - current_time).days)
+    today = current_time.toordinal()
+    if current_time != datetime.combine(current_time.date(), datetime.min.time()):
+        today += 1
+    
+    # Single pass keeping the most urgent task: lowest urgency category first,
+    # then fewest days (fewest days overdue for overdue tasks)
+    best = None  # (category_rank, days_key, task, days_until)
     
     for task in tasks_with_deadlines:
-        try:
-            deadline_date = datetime.strptime(task.deadline, "%Y-%m-%d")
-            days_until = (deadline_date - current_time).days
-            
-            if days_until < 0:
-                urgency_categories["overdue"].append((task, days_until))
-            elif days_until == 0:
-                urgency_categories["due_today"].append((task, days_until))
-            elif days_until == 1:
-                urgency_categories["due_tomorrow"].append((task, days_until))
-            elif days_until <= 7:
-                urgency_categories["due_week"].append((task, days_until))
-            else:
-                urgency_categories["due_later"].append((task, days_until))
-        except:
+        deadline_ordinal = task.get_deadline_ordinal()
+        if deadline_ordinal is None:
             continue
-    
-    # Select the most urgent task
-    selected_task = None
-    warning = ""
-    urgency_level = "none"
-    
-    # Check categories in order of urgency
-    for category in ["overdue", "due_today", "due_tomorrow", "due_week", "due_later"]:
-        if urgency_categories[category]:
-            # Sort by days_until (ascending for overdue, ascending for others)
-            if category == "overdue":
-                urgency_categories[category].sort(key=lambda x: abs(x[1]))  # Most overdue first
-            else:
-                urgency_categories[category].sort(key=lambda x: x[1])  # Earliest first
-            
-            selected_task = urgency_categories[category][0][0]
-            urgency_level = category
-            
-            # Generate warning message
-            days = urgency_categories[category][0][1]
-            if category == "overdue":
-                warning = f"This task is {abs(days)} days OVERDUE! You should complete it immediately."
-            elif category == "due_today":
-                warning = f"This task is DUE TODAY! Complete it now."
-            elif category == "due_tomorrow":
-                warning = f"This task is due TOMORROW. Consider starting it today."
-            elif category == "due_week":
-                warning = f"This task is due in {days} days. Plan accordingly."
-            else:
-                warning = f"This task is due in {days} days."
-            break
+        
+        days_until = deadline_ordinal - today
+        if days_until < 0:
+            rank = 0
+        elif days_until == 0:
+            rank = 1
+        elif days_until == 1:
+            rank = 2
+        elif days_until <= 7:
+            rank = 3
+        else:
+            rank = 4
+        
+        if best is None or (rank, abs(days_until)) < best[:2]:
+            best = (rank, abs(days_until), task, days_until)
+    
+    if best is None:
+        return None, "", "none"
+    
+    rank, _, selected_task, days = best
+    urgency_level = URGENCY_LEVELS[rank]
+    
+    # Generate warning message
+    if urgency_level == "overdue":
+        warning = f"This task is {abs(days)} days OVERDUE! You should complete it immediately."
+    elif urgency_level == "due_today":
+        warning = f"This task is DUE TODAY! Complete it now."
+    elif urgency_level == "due_tomorrow":
+        warning = f"This task is due TOMORROW. Consider starting it today."
+    elif urgency_level == "due_week":
+        warning = f"This task is due in {days} days. Plan accordingly."
+    else:
+        warning = f"This task is due in {days} days."
     
     return selected_task, warning, urgency_level
 
 
-def csp_preferences(tasks, current_conditions, use_mrv=True, use_dh=True):
+def csp_preferences(tasks, current_conditions, use_mrv=True, use_dh=True, limit=None,
+                    collect_reasons=True):
     """
     CSP function for user preferences with time, resources, and emotion constraints.
     Uses MRV (Minimum Remaining Values) and Degree Heuristic.
@@ -281,6 +379,9 @@ def csp_preferences(tasks, current_conditions, use_mrv=True, use_dh=True):
         current_conditions: Dict with current_time, available_resources, current_emotion
         use_mrv: Whether to use MRV heuristic
         use_dh: Whether to use Degree Heuristic
+        limit: Only return the top `limit` tasks (None for all)
+        collect_reasons: Whether to report why tasks were excluded; when False,
+            a task is dropped at its first failed constraint
     
     Returns: List of recommended tasks sorted by fitness
     """
@@ -288,9 +389,13 @@ def csp_preferences(tasks, current_conditions, use_mrv=True, use_dh=True):
         return []
     
     # Extract current conditions
-    current_time = current_conditions.get("current_time", datetime.now())
+    current_time = current_conditions.get("current_time") or datetime.now()
     available_resources = current_conditions.get("available_resources", [])
     current_emotion = current_conditions.get("current_emotion", "neutral")
+    current_hour = current_time.hour
+    available_set = set(available_resources)
+    available_bits = get_bits(RESOURCE_ID, available_set)
+    emotion_bit = get_bits(EMOTION_ID, [current_emotion])
     
     # Step 1: Filter tasks that pass all hard constraints
     valid_tasks = []
@@ -298,57 +403,32 @@ def csp_preferences(tasks, current_conditions, use_mrv=True, use_dh=True):
     
     for task in tasks:
         reasons = []
-        # Check resource constraint
-        resource_valid = True
-        if "requires" in task.constraints:
-            required = task.constraints["requires"]
-            if isinstance(required, list):
-                for req in required:
-                    if req not in available_resources:
-                        resource_valid = False
-                        break
-            elif required not in available_resources:
-                resource_valid = False
-
+        # Check emotion constraint first, it is the cheapest test
+        # Manual preferences still need to match emotions, but get priority bonus in scoring
+        emotion_valid = bool(task.emotion_fit_bits & emotion_bit)
+        if not emotion_valid and not collect_reasons:
+            continue
+        
         # Check time constraint
         time_valid = True
-        if "allowed_time" in task.constraints:
-            allowed_time = task.constraints["allowed_time"]
-            if isinstance(allowed_time, dict):
-                start_hour = allowed_time.get("start", 0)
-                end_hour = allowed_time.get("end", 24)
-                current_hour = current_time.hour
-                if not (start_hour <= current_hour < end_hour):
-                    time_valid = False
+        if task.has_time and not (task.time_start <= current_hour < task.time_end):
+            time_valid = False
         
         # Check preferred_time (used by default tasks)
         if "preferred_time" in task.constraints:
-            pref = task.constraints["preferred_time"]
-            current_hour = current_time.hour
-            is_valid = True
-            
-            if pref == "morning":
-                is_valid = (6 <= current_hour < 12)
-            elif pref == "afternoon":
-                is_valid = (12 <= current_hour < 17)
-            elif pref == "evening":
-                is_valid = (17 <= current_hour < 22)
-            elif pref == "daylight":
-                is_valid = (7 <= current_hour < 18)
-            elif pref == "night":
-                is_valid = (19 <= current_hour or current_hour < 5)
-            # "any" is always valid
-            
-            if not is_valid:
+            valid_hours = PREFERRED_TIME_HOURS.get(task.constraints["preferred_time"])
+            if valid_hours is not None and current_hour not in valid_hours:
                 time_valid = False
         
-        # Check emotion constraint
-        # Manual preferences still need to match emotions, but get priority bonus in scoring
-        emotion_valid = current_emotion in task.emotion_fit
+        if not time_valid and not collect_reasons:
+            continue
+        
+        # Check resource constraint: every required bit must be available
+        resource_valid = not (task.required_bits & ~available_bits)
         
         if resource_valid and time_valid and emotion_valid:
             valid_tasks.append(task)
-        else:
+        elif collect_reasons:
             if not resource_valid: reasons.append("Resource constraint")
             if not time_valid: reasons.append("Time constraint")
             if not emotion_valid: reasons.append(f"Emotion mismatch ({current_emotion})")
@@ -362,21 +442,14 @@ def csp_preferences(tasks, current_conditions, use_mrv=True, use_dh=True):
             
             # Time flexibility: how strict is the time constraint?
             time_flexibility = 0
-            if "allowed_time" in task.constraints:
-                allowed_time = task.constraints["allowed_time"]
-                if isinstance(allowed_time, dict):
-                    start = allowed_time.get("start", 0)
-                    end = allowed_time.get("end", 24)
-                    time_flexibility = end - start  # Larger window = more flexible
+            if task.has_time:
+                time_flexibility = task.time_end - task.time_start  # Larger window = more flexible
             
             # Resource requirements: fewer requirements = more flexible
+            # (a single non-list requirement counts as one)
             resource_flexibility = 0
-            if "requires" in task.constraints:
-                required = task.constraints["requires"]
-                if isinstance(required, list):
-                    resource_flexibility = 10 - len(required)  # Fewer requirements = higher flexibility
-                else:
-                    resource_flexibility = 9  # Single requirement
+            if task.has_requires:
+                resource_flexibility = 10 - len(task.required_resources)
             
             # Emotion fit: more emotions = more flexible
             emotion_flexibility = len(task.emotion_fit)
@@ -387,42 +460,50 @@ def csp_preferences(tasks, current_conditions, use_mrv=True, use_dh=True):
     
     # Step 3: Calculate degree for Degree Heuristic
     if use_dh:
+        # Index the shared constraints once instead of comparing every pair of
+        # tasks: identical time windows are grouped, and each requirement maps
+        # to the number of tasks that need it
+        window_counts = Counter()
+        resource_counts = Counter()     # Requirement -> tasks listing it
+        requirement_counts = Counter()  # Single (non-list) requirement -> tasks
+        
+        for task in valid_tasks:
+            window = get_time_window(task)
+            if window is not None:
+                window_counts[window] += 1
+            
+            if task.has_requires:
+                if task.requires_list:
+                    resource_counts.update(task.requires_set)
+                else:
+                    requirement_counts[task.required_resources[0]] += 1
+        
+        # Number of tasks whose window overlaps each distinct window
+        overlap_counts = {}
+        for start, end in window_counts:
+            overlap_counts[(start, end)] = sum(
+                count for (other_start, other_end), count in window_counts.items()
+                if not (end <= other_start or start >= other_end)
+            )
+        
         for task in valid_tasks:
             # Count how many other tasks share constraints with this one
             degree = 0
             
-            for other_task in valid_tasks:
-                if task == other_task:
-                    continue
-                
-                # Share time constraints?
-                if ("allowed_time" in task.constraints and 
-                    "allowed_time" in other_task.constraints):
-                    task_time = task.constraints["allowed_time"]
-                    other_time = other_task.constraints["allowed_time"]
-                    
-                    if isinstance(task_time, dict) and isinstance(other_time, dict):
-                        task_start = task_time.get("start", 0)
-                        task_end = task_time.get("end", 24)
-                        other_start = other_time.get("start", 0)
-                        other_end = other_time.get("end", 24)
-                        
-                        # Check for overlap
-                        if not (task_end <= other_start or task_start >= other_end):
-                            degree += 1
-                
-                # Share resource requirements?
-                if ("requires" in task.constraints and 
-                    "requires" in other_task.constraints):
-                    task_req = task.constraints["requires"]
-                    other_req = other_task.constraints["requires"]
-                    
-                    if isinstance(task_req, list) and isinstance(other_req, list):
-                        common = set(task_req) & set(other_req)
-                        if common:
-                            degree += len(common)
-                    elif task_req == other_req:
-                        degree += 1
+            # Share time constraints?
+            window = get_time_window(task)
+            if window is not None:
+                start, end = window
+                degree += overlap_counts[window]
+                if start < end:
+                    degree -= 1  # Don't count overlap with itself
+            
+            # Share resource requirements?
+            if task.has_requires:
+                if task.requires_list:
+                    degree += sum(resource_counts[req] - 1 for req in task.requires_set)
+                else:
+                    degree += requirement_counts[task.required_resources[0]] - 1
             
             task.degree_score = degree
     
@@ -431,8 +512,8 @@ def csp_preferences(tasks, current_conditions, use_mrv=True, use_dh=True):
         # Combine MRV and DH: prioritize tasks with low MRV (few options) and high degree (constraining others)
         for task in valid_tasks:
             # Normalize scores (inverse for MRV since we want low MRV)
-            mrv_norm = 10 - getattr(task, 'mrv_score', 5)  # Default 5 if not calculated
-            dh_norm = getattr(task, 'degree_score', 0)
+            mrv_norm = 10 - task.mrv_score
+            dh_norm = task.degree_score
             
             # Weighted combination (adjust weights as needed)
             task.heuristic_score = 0.6 * mrv_norm + 0.4 * dh_norm
@@ -440,10 +521,10 @@ def csp_preferences(tasks, current_conditions, use_mrv=True, use_dh=True):
         valid_tasks.sort(key=lambda x: x.heuristic_score, reverse=True)
     
     elif use_mrv:
-        valid_tasks.sort(key=lambda x: getattr(x, 'mrv_score', 0))
+        valid_tasks.sort(key=lambda x: x.mrv_score)
     
     elif use_dh:
-        valid_tasks.sort(key=lambda x: getattr(x, 'degree_score', 0), reverse=True)
+        valid_tasks.sort(key=lambda x: x.degree_score, reverse=True)
     
     # Step 5: Apply soft constraints and score
     scored_tasks = []
@@ -452,21 +533,16 @@ def csp_preferences(tasks, current_conditions, use_mrv=True, use_dh=True):
         fitness = 0
         
         # Time fitness: how close to optimal time?
-        if "allowed_time" in task.constraints and isinstance(task.constraints["allowed_time"], dict):
-            allowed_time = task.constraints["allowed_time"]
-            optimal_hour = allowed_time.get("optimal", (allowed_time.get("start", 0) + allowed_time.get("end", 24)) / 2)
-            time_diff = abs(current_time.hour - optimal_hour)
+        if task.optimal_hour is not None:
+            time_diff = abs(current_hour - task.optimal_hour)
             time_fitness = max(0, 10 - time_diff)  # Higher if closer to optimal
             fitness += time_fitness * 0.4
         
         # Resource fitness: prefer tasks using available resources
-        if "requires" in task.constraints:
-            required = task.constraints["requires"]
-            if isinstance(required, list):
-                available_count = sum(1 for req in required if req in available_resources)
-                resource_fitness = (available_count / len(required)) * 10
-            else:
-                resource_fitness = 10 if required in available_resources else 0
+        if task.required_resources:
+            required = task.required_resources
+            available_count = sum(1 for req in required if req in available_set)
+            resource_fitness = (available_count / len(required)) * 10
             fitness += resource_fitness * 0.3
         
         # Emotion fitness: exact match vs close emotions
@@ -474,19 +550,29 @@ def csp_preferences(tasks, current_conditions, use_mrv=True, use_dh=True):
         fitness += emotion_fitness * 0.3
         
         # User Preference Bonus: Give HUGE priority to custom user preferences
-        if getattr(task, 'is_preference', False):
+        if task.is_preference:
              fitness += 30
         
         task.fitness_score = fitness
         scored_tasks.append((fitness, task))
     
-    # Sort by fitness score
-    scored_tasks.sort(key=lambda x: x[0], reverse=True)
+    # Sort by fitness score (only the top few when a limit is given)
+    if limit is not None:
+        scored_tasks = nlargest(limit, scored_tasks, key=lambda x: x[0])
+    else:
+        scored_tasks.sort(key=lambda x: x[0], reverse=True)
     
     # Return sorted list of tasks AND excluded reasons
     return [task for _, task in scored_tasks], excluded_reasons
 
 
+def get_time_window(task):
+    """Return the (start, end) hours of a task's allowed_time, or None"""
+    if task.has_time:
+        return task.time_start, task.time_end
+    return None
+
+
 def create_preference_task(name, emotions, time_range, required_resources, base_priority=5):
     """
     Helper function to create a preference task with proper constraints.
@@ -532,6 +618,14 @@ def create_preference_task(name, emotions, time_range, required_resources, base_
 # MAIN FILTERING AND SELECTION ALGORITHMS
 # ==============================================
 
+def build_emotion_index(tasks):
+    """Map each emotion to the tasks that fit it, in one pass (keeps task order)"""
+    index = {}
+    for task in tasks:
+        for emotion in dict.fromkeys(task.emotion_fit):
+            index.setdefault(emotion, []).append(task)
+    return index
+
 def apply_strict_constraints(tasks, conditions, current_emotion):
     """
     Standardizes constraint filtering across all algorithms.
@@ -540,28 +634,26 @@ def apply_strict_constraints(tasks, conditions, current_emotion):
     if not tasks:
         return []
         
-    current_time = conditions.get("current_time", datetime.now())
-    available_resources = conditions.get("available_resources", [])
+    current_time = conditions.get("current_time") or datetime.now()
+    emotion_bit = get_bits(EMOTION_ID, [current_emotion])
     
-    valid_tasks = []
-    for task in tasks:
-        # 1. Emotion constraint
-        if current_emotion not in task.emotion_fit:
-            # Check if it's a high priority must-do task (allow slight mismatch for these)
-            if not (hasattr(task, 'task_type') and task.task_type == "must_do" and task.base_priority >= 7):
-                continue
-        
-        # 2. Time constraint
-        if not task.is_time_suitable(current_time):
-            continue
-            
-        # 3. Resource constraint
-        if not task.check_constraints(conditions):
-            continue
-            
-        valid_tasks.append(task)
-        
-    return valid_tasks
+    return [task for task in tasks
+            if constraint_ok(task, current_time, conditions, emotion_bit)]
+
+def constraint_ok(task, current_time, conditions, emotion_bit):
+    """Check a single task against the strict emotion, time and resource constraints"""
+    # 1. Emotion constraint (emotion_bit is the current emotion's bit in EMOTION_ID)
+    if not task.emotion_fit_bits & emotion_bit:
+        # Check if it's a high priority must-do task (allow slight mismatch for these)
+        if not (task.task_type == "must_do" and task.base_priority >= 7):
+            return False
+    
+    # 2. Time constraint
+    if not task.is_time_suitable(current_time):
+        return False
+    
+    # 3. Resource constraint
+    return task.check_constraints(conditions, current_time)
 
 def csp_filter(tasks, emotion, current_conditions=None):
     """
@@ -577,56 +669,57 @@ def csp_filter(tasks, emotion, current_conditions=None):
     
     return recommended_tasks, warnings
 
-def greedy(tasks, emotion=None, current_conditions=None):
-    """Production-ready greedy algorithm using compute_score() as heuristic"""
+def greedy(tasks, emotion=None, current_conditions=None, skip_constraints=False):
+    """
+    Production-ready greedy algorithm using compute_score() as heuristic
+    
+    Pass skip_constraints=True when the tasks were already filtered with
+    apply_strict_constraints.
+    """
     if not tasks:
         return None
     
-    # Extract current conditions
-    current_time = datetime.now()
+    # Extract current conditions, reading the clock at most once
+    current_time = None
     current_energy = 5
     preference_bonus = 0
     urgency_bonus = 0
     
     if current_conditions:
-        current_time = current_conditions.get("current_time", datetime.now())
+        current_time = current_conditions.get("current_time")
         current_energy = current_conditions.get("current_energy", 5)
         preference_bonus = current_conditions.get("preference_bonus", 0)
         urgency_bonus = current_conditions.get("urgency_bonus", 0)
     
-    # Apply strict constraints
-    valid_tasks = apply_strict_constraints(tasks, current_conditions or {}, emotion or "neutral")
+    if current_time is None:
+        current_time = datetime.now()
     
-    if not valid_tasks:
-        return None
+    conditions = current_conditions or {}
+    current_emotion = emotion if emotion else "neutral"
+    emotion_bit = get_bits(EMOTION_ID, [current_emotion])
+    
+    # Apply strict constraints, score and keep the best in one pass: HIGHEST
+    # score wins (Greedy: choose best estimated), ties broken by priority,
+    # then by shorter duration
+    best_task = None
+    best_key = None
+    
+    for task in tasks:
+        if not skip_constraints and not constraint_ok(task, current_time, conditions, emotion_bit):
+            continue
         
-    # Compute scores for valid tasks
-    for task in valid_tasks:
-        task.heuristic_score = task.compute_score(
-            current_emotion=emotion if emotion else "neutral",
+        score = task.compute_score(
+            current_emotion=current_emotion,
             current_time=current_time,
             current_energy=current_energy,
             preference_bonus=preference_bonus,
             urgency_bonus=urgency_bonus
         )
-    
-    # Find best task with HIGHEST heuristic score (Greedy: choose best estimated)
-    best_task = None
-    best_score = float('-inf')
-    
-    for task in valid_tasks:
-        current_score = getattr(task, 'heuristic_score', 0)
+        key = (score, task.base_priority, -task.duration)
         
-        if current_score > best_score:
-            best_score = current_score
+        if best_key is None or key > best_key:
+            best_key = key
             best_task = task
-        elif current_score == best_score and best_task:
-            # Tie-breaking: use priority, then duration
-            if task.base_priority > best_task.base_priority:
-                best_task = task
-            elif task.base_priority == best_task.base_priority:
-                if task.duration < best_task.duration:
-                    best_task = task
     
     return best_task
 
@@ -652,82 +745,72 @@ def hill_climbing(tasks, current_conditions=None, max_iterations=5):
     if not valid_tasks:
         return None
     
-    # Ensure all tasks have scores computed
+    # Ensure all tasks have scores computed (against one clock reading)
+    now = datetime.now()
     for task in valid_tasks:
-        task.compute_score(current_emotion, current_energy=current_energy)
+        task.compute_score(current_emotion, current_time=now, current_energy=current_energy)
     
     # Start with the task that has the highest score
     current_best = max(valid_tasks, key=lambda t: t.score)
     
+    # A neighbor is only moved to if it beats the current task, so rank the
+    # candidates by score once (ties keep list order) and scan from the top:
+    # the first similar enough task is the best neighbor
+    candidates = sorted(tasks, key=lambda t: t.score, reverse=True)
+    
     for iteration in range(max_iterations):
-        # Find neighboring tasks (similar tasks)
-        neighbors = []
-        
-        for task in tasks:
-            if task == current_best:
-                continue
-            
-            # Calculate similarity between tasks
-            similarity = calculate_task_similarity(current_best, task)
-            
-            # Consider as neighbor if similar enough (≥ 60%)
-            if similarity >= 0.6:
-                neighbors.append(task)
-        
-        if not neighbors:
-            break  # No more neighbors to explore
-        
-        # Find best neighbor
-        best_neighbor = max(neighbors, key=lambda t: t.score)
+        # Find best neighbor (similar task): consider as neighbor if similar
+        # enough (≥ 60%)
+        best_neighbor = None
+        for task in candidates:
+            if task.score <= current_best.score:
+                break  # Everything below can't improve on the current task
+            if task is not current_best and calculate_task_similarity(current_best, task) >= 0.6:
+                best_neighbor = task
+                break
         
         # Move to neighbor only if it's better (hill climbing principle)
-        if best_neighbor.score > current_best.score:
-            current_best = best_neighbor
-        else:
+        if best_neighbor is None:
             break  # No improvement found, reached local optimum
+        current_best = best_neighbor
     
     return current_best
 
 def calculate_task_similarity(task1, task2):
     """Calculate similarity between two preference/mood tasks"""
     similarity = 0.0
-    factors = 0
-    
-    # 1. Emotion fit similarity - weighted higher
-    if hasattr(task1, 'emotion_fit') and hasattr(task2, 'emotion_fit'):
-        emotion_overlap = len(set(task1.emotion_fit) & set(task2.emotion_fit))
-        emotion_total = len(set(task1.emotion_fit) | set(task2.emotion_fit))
-        if emotion_total > 0:
-            similarity += (emotion_overlap / emotion_total) * 2
-            factors += 2
+    factors = 3  # Priority, task type and category always count
+    
+    # 1. Emotion fit similarity - weighted higher; each emotion is one bit,
+    # so overlap and union sizes are bit counts
+    emotion_bits1 = task1.emotion_fit_bits
+    emotion_bits2 = task2.emotion_fit_bits
+    emotion_total = bin(emotion_bits1 | emotion_bits2).count("1")
+    if emotion_total > 0:
+        emotion_overlap = bin(emotion_bits1 & emotion_bits2).count("1")
+        similarity += (emotion_overlap / emotion_total) * 2
+        factors += 2
     
     # 2. Duration similarity
-    if hasattr(task1, 'duration') and hasattr(task2, 'duration'):
-        if task1.duration > 0 and task2.duration > 0:
-            duration_ratio = min(task1.duration, task2.duration) / max(task1.duration, task2.duration)
-            similarity += duration_ratio
-            factors += 1
+    duration1 = task1.duration
+    duration2 = task2.duration
+    if duration1 > 0 and duration2 > 0:
+        similarity += min(duration1, duration2) / max(duration1, duration2)
+        factors += 1
     
     # 3. Priority similarity
-    if hasattr(task1, 'base_priority') and hasattr(task2, 'base_priority'):
-        priority_diff = abs(task1.base_priority - task2.base_priority)
-        similarity += (10 - priority_diff) / 10
-        factors += 1
+    similarity += (10 - abs(task1.base_priority - task2.base_priority)) / 10
     
     # 4. Task type similarity
-    if hasattr(task1, 'task_type') and hasattr(task2, 'task_type'):
-        if task1.task_type == task2.task_type:
-            similarity += 1.0
-        factors += 1
+    if task1.task_type == task2.task_type:
+        similarity += 1.0
     
     # 5. Category similarity
-    if hasattr(task1, 'category') and hasattr(task2, 'category'):
-        if task1.category == task2.category:
-            similarity += 1.0
-        factors += 1
+    if task1.category == task2.category:
+        similarity += 1.0
     
     # Return weighted average similarity
-    return similarity / factors if factors > 0 else 0.5
+    return similarity / factors
 
 def stochastic(tasks, emotion=None, current_conditions=None):
     """
@@ -736,18 +819,22 @@ def stochastic(tasks, emotion=None, current_conditions=None):
     if not tasks:
         return None
     
-    # Apply strict constraints
-    valid_tasks = apply_strict_constraints(tasks, current_conditions or {}, emotion or "neutral")
+    conditions = current_conditions or {}
+    current_time = conditions.get("current_time") or datetime.now()
+    emotion_bit = get_bits(EMOTION_ID, [emotion or "neutral"])
     
-    if not valid_tasks:
-        return None
-    
-    # If only one task, return it
-    if len(valid_tasks) == 1:
-        return valid_tasks[0]
+    # Apply strict constraints and pick uniformly in the same pass
+    # (reservoir sampling: keep the k-th valid task with probability 1/k),
+    # so no list of valid tasks is built
+    chosen = None
+    valid_count = 0
+    for task in tasks:
+        if constraint_ok(task, current_time, conditions, emotion_bit):
+            valid_count += 1
+            if valid_count == 1 or random.randrange(valid_count) == 0:
+                chosen = task
     
-    # PURE RANDOM selection
-    return random.choice(valid_tasks)
+    return chosen
 
 
 def mini_a_star(tasks, current_emotion, current_conditions=None, max_sequence_length=3, user_preferences=None):
@@ -780,10 +867,15 @@ def mini_a_star(tasks, current_emotion, current_conditions=None, max_sequence_le
         energy = current_conditions.get("current_energy", 5)
         fatigue_score = 10 - energy
     
+    # One clock reading for the whole search
+    search_time = datetime.now()
+    current_hour = search_time.hour
+    
     # g(n): Cost of current task - KEEPING THE SAME AS BEFORE
-    def g_score(task, emotion, is_first=False):
+    def g_score(task, emotion_bit, is_first=False):
+        emotion_match = bool(task.emotion_fit_bits & emotion_bit)
         cost = 10 - task.base_priority                     # Higher priority → lower cost
-        if emotion not in task.emotion_fit:
+        if not emotion_match:
             cost += 5                                  # Emotion mismatch penalty
         cost += fatigue_score * 0.5                    # Fatigue penalty
         if is_first:
@@ -792,27 +884,32 @@ def mini_a_star(tasks, current_emotion, current_conditions=None, max_sequence_le
         # Special handling for preference tasks
         if hasattr(task, 'task_type') and task.task_type == "preference":
             # Lower cost for preference tasks that match current emotion well
-            if emotion in task.emotion_fit:
+            if emotion_match:
                 cost -= 3
             # Consider time constraints for preference tasks
-            if "allowed_time" in task.constraints:
-                current_hour = datetime.now().hour
-                time_constraint = task.constraints["allowed_time"]
-                if isinstance(time_constraint, dict):
-                    start = time_constraint.get("start", 0)
-                    end = time_constraint.get("end", 24)
-                    if not (start <= current_hour < end):
-                        cost += 5  # Penalty if not in allowed time
+            if task.has_time and not (task.time_start <= current_hour < task.time_end):
+                cost += 5  # Penalty if not in allowed time
         
         return max(0, cost)  # Ensure non-negative
 
     # h(n): Estimated future benefit - USING compute_score() as heuristic
+    # The score only depends on the task and the predicted emotion during one
+    # search, so each pair is scored once and looked up afterwards
+    h_cache = {}
+    
     def h_score(task, predicted_emotion):
+        key = (id(task), predicted_emotion)
+        h = h_cache.get(key)
+        if h is None:
+            h = h_cache[key] = compute_h_score(task, predicted_emotion)
+        return h
+    
+    def compute_h_score(task, predicted_emotion):
         # Use compute_score() as the heuristic estimate
         # We want to convert score (higher = better) to cost (lower = better) for A*
         heuristic_value = task.compute_score(
             current_emotion=predicted_emotion,  # Use predicted emotion for h(n)
-            current_time=datetime.now(),
+            current_time=search_time,
             current_energy=10 - fatigue_score,  # Convert fatigue to energy (0-10 scale)
             preference_bonus=0,
             urgency_bonus=0
@@ -858,11 +955,16 @@ def mini_a_star(tasks, current_emotion, current_conditions=None, max_sequence_le
         def __init__(self, task, emotion, g, h, parent=None):
             self.task = task
             self.emotion_after = predict_next_emotion(task, emotion)
+            self.emotion_after_bit = get_bits(EMOTION_ID, [self.emotion_after])
             self.g = g
             self.h = h
             self.f = g + h  # Total cost to minimize
             self.parent = parent
             self.depth = 1 if parent is None else parent.depth + 1
+            # Ids of the tasks on the path to this node, for repetition checks
+            self.visited = frozenset((id(task),)) if parent is None else parent.visited | {id(task)}
+            self.key = None  # Dominance key, set for expanded (non-root) nodes
+            self._sequence = None
 
         def __lt__(self, other):
             return self.f < other.f
@@ -875,28 +977,57 @@ def mini_a_star(tasks, current_emotion, current_conditions=None, max_sequence_le
                     self.h == other.h)
 
         def sequence(self):
-            seq = []
-            node = self
-            while node:
-                seq.insert(0, node.task)
-                node = node.parent
-            return seq
+            if self._sequence is None:
+                seq = []
+                node = self
+                while node:
+                    seq.append(node.task)
+                    node = node.parent
+                seq.reverse()
+                self._sequence = seq
+            return list(self._sequence)
+
+    # Open Set as a bucket queue: f is a small bounded number, so nodes are
+    # grouped by its integer part and the lowest non-empty bucket is popped
+    buckets = {}
+    open_count = 0
+    lowest = None
+
+    def push(node):
+        nonlocal open_count, lowest
+        key = int(node.f // 1)
+        buckets.setdefault(key, []).append(node)
+        open_count += 1
+        if lowest is None or key < lowest:
+            lowest = key
 
-    # Initialize Open Set
-    open_set = []
+    def pop():
+        nonlocal open_count, lowest
+        while not buckets.get(lowest):
+            lowest += 1
+        open_count -= 1
+        return buckets[lowest].pop()
 
+    current_emotion_bit = get_bits(EMOTION_ID, [current_emotion])
     for task in all_tasks:
-        g = g_score(task, current_emotion, is_first=True)
+        g = g_score(task, current_emotion_bit, is_first=True)
         h = h_score(task, predict_next_emotion(task, current_emotion))
-        node = Node(task, current_emotion, g, h)
-        heappush(open_set, (g + h, id(node), node))
+        push(Node(task, current_emotion, g, h))
 
     best_sequence = None
     best_score = float("inf")
+    
+    # Lowest g seen per (tasks used so far, next task, emotion before it).
+    # Paths sharing that state have identical futures, so a path that is
+    # not cheaper than a known one is dominated and need not be expanded
+    best_g = {}
 
     # Mini A* Search Loop
-    while open_set:
-        _, _, node = heappop(open_set)
+    while open_count:
+        node = pop()
+        
+        if node.key is not None and node.g > best_g[node.key]:
+            continue  # A cheaper equivalent path was found after this push
 
         if node.depth >= max_sequence_length:
             if node.f < best_score:
@@ -905,29 +1036,38 @@ def mini_a_star(tasks, current_emotion, current_conditions=None, max_sequence_le
             continue
 
         for next_task in all_tasks:
-            if next_task in node.sequence():
+            if id(next_task) in node.visited:
                 continue  # Avoid repetition
             
             # Check if emotion matches well for the predicted state
-            predicted_emotion = node.emotion_after
-            if predicted_emotion not in next_task.emotion_fit:
+            if not next_task.emotion_fit_bits & node.emotion_after_bit:
                 # Still allow high priority tasks
-                if not (hasattr(next_task, 'task_type') and next_task.task_type == "must_do" and next_task.base_priority >= 7):
+                if not (next_task.task_type == "must_do" and next_task.base_priority >= 7):
                     continue
 
-            g_new = node.g + g_score(next_task, node.emotion_after)
+            g_new = node.g + g_score(next_task, node.emotion_after_bit)
+            
+            # Skip dominated paths
+            key = (node.visited, id(next_task), node.emotion_after)
+            known_g = best_g.get(key)
+            if known_g is not None and known_g <= g_new:
+                continue
+            best_g[key] = g_new
+            
             h_new = h_score(next_task, predict_next_emotion(next_task, node.emotion_after))
 
             # Create node
             new_node = Node(next_task, node.emotion_after, g_new, h_new, node)
-            heappush(open_set, (g_new + h_new, id(new_node), new_node))
+            new_node.key = key
+            push(new_node)
 
     # Return best sequence or fallback
     if best_sequence and len(best_sequence) >= 2:
         return best_sequence[:max_sequence_length]
     
-    # Fallback: use greedy as fallback (consistent with heuristic)
-    fallback_task = greedy(all_tasks, current_emotion)
+    # Fallback: use greedy as fallback (consistent with heuristic); the
+    # pool already passed the strict constraints above
+    fallback_task = greedy(all_tasks, current_emotion, skip_constraints=True)
     return [fallback_task] if fallback_task else []
 
 def fallback_sequence_with_preferences(all_tasks, emotion, user_preferences=None, length=3):
@@ -943,38 +1083,44 @@ def fallback_sequence_with_preferences(all_tasks, emotion, user_preferences=None
         # If no tasks match emotion, use all tasks
         matching_tasks = all_tasks
     
+    # Split the matching tasks into category buckets in one pass
+    mood_tasks = []        # Used when mood improvement comes first
+    work_tasks = []
+    preference_tasks = []  # Used when productivity comes first
+    for t in matching_tasks:
+        if t.category in WORK_CATEGORIES:
+            work_tasks.append(t)
+        elif t.category in MOOD_CATEGORIES:
+            mood_tasks.append(t)
+            if t.category in PREFERENCE_CATEGORIES:
+                preference_tasks.append(t)
+    
+    # Only the top few of each bucket are needed, so select them with
+    # nlargest rather than sorting whole buckets (ties keep list order)
+    by_priority = lambda x: x.base_priority
+    
     if emotion in ["sad", "angry", "tired", "stressed"]:
         # Mood improvement → productivity
-        mood_tasks = [t for t in matching_tasks if t.category in ["break", "personal", "life", "mood_enhancer", "user_preference"]]
-        work_tasks = [t for t in matching_tasks if t.category in ["academic", "work", "todo_must"]]
-
         if mood_tasks:
             # Sort by priority and duration (shorter first for mood tasks)
-            mood_tasks.sort(key=lambda x: (x.base_priority, -x.duration), reverse=True)
-            sequence.extend(mood_tasks[:1])
+            sequence.extend(nlargest(1, mood_tasks, key=lambda x: (x.base_priority, -x.duration)))
         
         if work_tasks and len(sequence) < length:
-            work_tasks.sort(key=lambda x: x.base_priority, reverse=True)
-            sequence.extend(work_tasks[:length - len(sequence)])
+            sequence.extend(nlargest(length - len(sequence), work_tasks, key=by_priority))
 
     else:
         # Neutral/good emotions: Focus on productivity first, then preferences
-        productive_tasks = [t for t in matching_tasks if t.category in ["academic", "work", "todo_must"]]
-        preference_tasks = [t for t in matching_tasks if t.category in ["user_preference", "mood_enhancer"]]
-        
-        if productive_tasks:
-            productive_tasks.sort(key=lambda x: x.base_priority, reverse=True)
-            sequence.extend(productive_tasks[:min(2, length)])
+        if work_tasks:
+            sequence.extend(nlargest(min(2, length), work_tasks, key=by_priority))
         
         if preference_tasks and len(sequence) < length:
-            preference_tasks.sort(key=lambda x: x.base_priority, reverse=True)
-            sequence.extend(preference_tasks[:length - len(sequence)])
+            sequence.extend(nlargest(length - len(sequence), preference_tasks, key=by_priority))
 
     # Fill remaining slots if needed
     if len(sequence) < length:
-        remaining = [t for t in matching_tasks if t not in sequence]
-        remaining.sort(key=lambda x: x.base_priority, reverse=True)
-        sequence.extend(remaining[:length - len(sequence)])
+        chosen = {id(t) for t in sequence}
+        remaining = [t for t in matching_tasks if id(t) not in chosen]
+        sequence.extend(nlargest(length - len(sequence), remaining, key=by_priority))
 
     return sequence[:length]
 
@@ -991,38 +1137,37 @@ def multi_objective_optimization(tasks, weights=None):
     if weights is None:
         weights = {'score': 0.5, 'duration': 0.3, 'success': 0.2}
     
+    # Largest score and duration, found once for normalizing to 0-1
+    max_score = max(t.score for t in tasks)
+    max_duration = max(t.duration for t in tasks)
+    score_weight = weights['score']
+    duration_weight = weights['duration']
+    success_weight = weights['success']
+    
     optimized = []
     for task in tasks:
-        # Normalize values to 0-1 range
-        max_score = max(t.score for t in tasks) if tasks else 1
         score_norm = task.score / max_score if max_score > 0 else 0
         
         # Duration: shorter is better, inverse relationship
-        max_duration = max(t.duration for t in tasks) if tasks else 1
         duration_norm = 1 - (task.duration / max_duration if max_duration > 0 else 0)
         
-        # Success rate already 0-1
-        success_norm = task.success_rate
-        
-        # Combined score
-        combined = (weights['score'] * score_norm +
-                   weights['duration'] * duration_norm +
-                   weights['success'] * success_norm)
+        # Combined score (success rate is already 0-1)
+        combined = (score_weight * score_norm +
+                    duration_weight * duration_norm +
+                    success_weight * task.success_rate)
         
         optimized.append((combined, task))
     
-    optimized.sort(key=lambda x: x[0], reverse=True)
-    return [task for score, task in optimized[:3]]
+    return [task for score, task in nlargest(3, optimized, key=lambda x: x[0])]
 
 def analyze_csp_failure(tasks, emotion, conditions):
     """Analyze why CSP filtered out tasks"""
-    constraints_pass = []
-    
-    # Check each constraint
-    emotion_matches = [t for t in tasks if emotion in t.emotion_fit]
-    
-    time_suitable = [t for t in emotion_matches if t.is_time_suitable(conditions.get("current_time", datetime.now()))]
-    
-    constraints_pass = [t for t in time_suitable if t.check_constraints(conditions)]
-    
-    return constraints_pass
\ No newline at end of file
+    current_time = conditions.get("current_time") or datetime.now()
+    emotion_bit = get_bits(EMOTION_ID, [emotion])
+    
+    # Check each constraint in turn (emotion, time, then resources) in a
+    # single pass, without building a list per stage
+    return [t for t in tasks
+            if t.emotion_fit_bits & emotion_bit
+            and t.is_time_suitable(current_time)
+            and t.check_constraints(conditions, current_time)]
\ No newline at end of file
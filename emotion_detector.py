@@ -1,48 +1,236 @@
 # emotion_detector.py
 import cv2
+import numpy as np
 from fer import FER
 import time
+import threading
+import multiprocessing
+import queue
+from collections import Counter, deque
+
+# FER models are expensive to load, so one instance per face detector type
+# is shared by every EmotionDetector in the process (loaded once, and used
+# by one inference at a time)
+_shared_fer = {}
+_fer_lock = threading.Lock()
+
+def get_fer(mtcnn=False):
+    """Return the shared FER model, loading it on first use"""
+    with _fer_lock:
+        if mtcnn not in _shared_fer:
+            _shared_fer[mtcnn] = FER(mtcnn=mtcnn)
+        return _shared_fer[mtcnn]
+
+def inference_worker(frames, results, mtcnn):
+    """Child process: run inference on JPEG frames and send back the results"""
+    detector = EmotionDetector(mtcnn)
+    while True:
+        item = frames.get()
+        if item is None:
+            break
+        data, captured_at = item
+        frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        try:
+            results.put((detector.infer(frame), captured_at))
+        except Exception as e:
+            print(f"Emotion detection error: {e}")
 
 class EmotionDetector:
-    def __init__(self):
-        self.detector = FER(mtcnn=True)
+    def __init__(self, mtcnn=False, use_process=False):
+        # Faces are found with OpenCV's cascade detector by default, a single
+        # native call per frame instead of MTCNN's three CNN stages;
+        # pass mtcnn=True for MTCNN's better accuracy on hard poses
+        self.mtcnn = mtcnn
+        
+        # With use_process=True inference runs in a child process with its
+        # own interpreter, so it never holds the caller's GIL (e.g. a Tk
+        # main loop); the model is then only loaded in the child
+        self.use_process = use_process
+        self.process = None
+        self.frames = None
+        self.results = None
+        self.detector = None if use_process else get_fer(mtcnn)
         self.last_detection_time = 0
         self.detection_interval = 1  # seconds
         self.current_emotion = "neutral"
-        self.emotion_history = []
+        self.emotion_history = deque(maxlen=10)  # Keeps only the last 10 emotions
+        self.detection_width = 320  # Frames are shrunk to this width before inference
+        self.scratch = None  # Reused buffer for the shrunk frame
+        
+        # Near-identical frames reuse the previous inference result, but at
+        # most max_reuse times in a row: the hash sees the whole scene, not
+        # the expression, so a fresh inference still runs every few seconds
+        self.last_hash = None
+        self.last_result = None
+        self.reuse_count = 0
+        self.max_reuse = 4
+        
+        # Inference runs on a background thread so the camera loop never
+        # waits for it; only the newest frame is kept for the worker
+        self.history_lock = threading.Lock()
+        self.frame_ready = threading.Condition()
+        self.pending_frame = None
+        self.worker = None
+        self.stopping = False  # Set by close() to end the worker thread
+        
+    def prepare_frame(self, frame):
+        """Downscale a camera frame for inference, keeping its aspect ratio"""
+        height, width = frame.shape[:2]
+        if width <= self.detection_width:
+            return frame
+        
+        # FER crops faces and resizes them to its small CNN input anyway, so
+        # detecting on a quarter-size frame loses little and cuts pixel work
+        size = (self.detection_width, round(height * self.detection_width / width))
+        self.scratch = cv2.resize(frame, size, dst=self.scratch, interpolation=cv2.INTER_AREA)
+        return self.scratch
+        
+    def average_hash(self, frame):
+        """64-cell average hash: which 8x8 cells are brighter than the mean"""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        cells = cv2.resize(gray, (8, 8), interpolation=cv2.INTER_AREA)
+        return int.from_bytes((cells > cells.mean()).tobytes(), "big")
+    
+    def infer(self, small):
+        """Run FER on a prepared frame, reusing the last result for a still scene"""
+        frame_hash = self.average_hash(small)
+        if (self.last_hash is not None and self.reuse_count < self.max_reuse
+                and bin(frame_hash ^ self.last_hash).count("1") < 5):
+            self.reuse_count += 1
+            return self.last_result
+        
+        with _fer_lock:
+            result = self.detector.top_emotion(small)
+        self.last_hash = frame_hash
+        self.last_result = result
+        self.reuse_count = 0
+        return result
         
     def detect_emotion_from_frame(self, frame):
-        """Detect emotion from frame, but only if enough time has passed"""
+        """
+        Hand a frame to the background detector if enough time has passed,
+        and return the latest detected emotion without waiting for it
+        """
         current_time = time.time()
         
-        # Only detect emotion every 10 seconds
+        # Only detect emotion once per detection_interval
         if current_time - self.last_detection_time >= self.detection_interval:
+            # Start the next interval even if this frame has no face or fails,
+            # so inference is never retried on every frame in between
+            self.last_detection_time = current_time
+            
+            if self.use_process:
+                self.send_to_process(frame, current_time)
+            else:
+                self.send_to_worker(frame, current_time)
+        
+        if self.use_process:
+            self.collect_results()
+        return self.current_emotion
+    
+    def send_to_worker(self, frame, captured_at):
+        """Hand a frame to the inference thread, starting it on first use"""
+        if self.worker is None:
+            self.worker = threading.Thread(target=self.detection_loop, daemon=True)
+            self.worker.start()
+        
+        with self.frame_ready:
+            # Shrink first so only the small frame is copied (callers draw
+            # on theirs, and scratch is reused); a frame the worker has not
+            # picked up yet is simply replaced
+            self.pending_frame = (self.prepare_frame(frame).copy(), captured_at)
+            self.frame_ready.notify()
+    
+    def send_to_process(self, frame, captured_at):
+        """Queue a shrunk, JPEG-encoded frame for the inference process"""
+        if self.process is None:
+            # spawn, since forking a process that runs threads (or Tk) is unsafe
+            context = multiprocessing.get_context("spawn")
+            self.frames = context.Queue(maxsize=1)
+            self.results = context.Queue()
+            self.process = context.Process(target=inference_worker,
+                                           args=(self.frames, self.results, self.mtcnn),
+                                           daemon=True)
+            self.process.start()
+        
+        ok, data = cv2.imencode(".jpg", self.prepare_frame(frame), [cv2.IMWRITE_JPEG_QUALITY, 90])
+        if ok:
             try:
-                result = self.detector.top_emotion(frame)
-                if result:
-                    emotion, score = result
-                    if score > 0.5:  # Only accept if confidence is high enough
-                        self.current_emotion = emotion
-                        self.emotion_history.append((emotion, current_time))
-                        # Keep only last 10 emotions
-                        if len(self.emotion_history) > 10:
-                            self.emotion_history.pop(0)
-                
-                self.last_detection_time = current_time
+                self.frames.put_nowait((data.tobytes(), captured_at))
+            except queue.Full:
+                pass  # The process is still busy; this frame is skipped
+    
+    def collect_results(self):
+        """Apply every result the inference process has sent back"""
+        while True:
+            try:
+                result, captured_at = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.record_result(result, captured_at)
+    
+    def record_result(self, result, captured_at):
+        """Accept a top_emotion result if a face was found with enough confidence"""
+        if result:
+            emotion, score = result  # (None, None) when no face is found
+            if score is not None and score > 0.5:  # Only accept if confidence is high enough
+                self.current_emotion = emotion
+                with self.history_lock:
+                    self.emotion_history.append((emotion, captured_at))
+    
+    def close(self):
+        """Stop the inference thread or process, if one was started"""
+        if self.worker is not None:
+            with self.frame_ready:
+                self.stopping = True
+                self.frame_ready.notify()
+            self.worker.join(timeout=2)  # Lets a running inference finish
+            self.worker = None
+        
+        if self.process is not None:
+            # A dead child never drains the one-frame queue, so the stop
+            # signal must not block
+            if self.process.is_alive():
+                try:
+                    self.frames.put(None, timeout=1)
+                except queue.Full:
+                    pass
+                self.process.join(timeout=2)
+                if self.process.is_alive():
+                    self.process.terminate()
+                    self.process.join(timeout=1)
+            self.process = None
+    
+    def detection_loop(self):
+        """Worker thread: run inference on the newest pending frame"""
+        while True:
+            with self.frame_ready:
+                while self.pending_frame is None and not self.stopping:
+                    self.frame_ready.wait()
+                if self.stopping:
+                    return
+                frame, captured_at = self.pending_frame
+                self.pending_frame = None
+            
+            try:
+                result = self.infer(frame)  # Already shrunk by send_to_worker
+                self.record_result(result, captured_at)
             except Exception as e:
                 print(f"Emotion detection error: {e}")
-        
-        return self.current_emotion
     
     def get_emotion_streak(self):
         """Check how long the same emotion has persisted"""
-        if len(self.emotion_history) < 2:
+        with self.history_lock:
+            history = list(self.emotion_history)
+        
+        if len(history) < 2:
             return 1
         
-        current = self.emotion_history[-1][0]
+        history = reversed(history)
+        current = next(history)[0]
         streak = 1
         
-        for emotion, _ in reversed(self.emotion_history[:-1]):
+        for emotion, _ in history:
             if emotion == current:
                 streak += 1
             else:
@@ -53,12 +241,23 @@ class EmotionDetector:
     def get_dominant_emotion(self, window_seconds=30):
         """Get the most frequent emotion in the last window_seconds"""
         cutoff_time = time.time() - window_seconds
-        recent = [e for e, t in self.emotion_history if t > cutoff_time]
+        with self.history_lock:
+            recent = [e for e, t in self.emotion_history if t > cutoff_time]
+        
+        if not recent:
+            return self.current_emotion
+        
+        counts = Counter(recent)
+        return counts.most_common(1)[0][0]
+    
+    def get_recent_majority(self, count=5):
+        """Get the most frequent emotion among the last count detections"""
+        with self.history_lock:
+            recent = [e for e, _ in list(self.emotion_history)[-count:]]
         
         if not recent:
             return self.current_emotion
         
-        from collections import Counter
         counts = Counter(recent)
         return counts.most_common(1)[0][0]
 
@@ -68,6 +267,14 @@ def start_camera():
         print("Error: Could not open camera.")
         return None
     
+    # A modest MJPG stream is cheaper to capture and decode than full-size
+    # raw YUYV, and a one-frame buffer keeps reads from returning stale frames
+    # (backends that do not support a setting simply ignore it)
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+    cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    
     # Initialize emotion detector
     detector = EmotionDetector()
     
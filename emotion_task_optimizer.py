@@ -1,11 +1,14 @@
 import time
 import os
 import cv2
+import numpy as np
 import pickle
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from heapq import nlargest
 from task import Task
 from algorithms import csp_filter, greedy, hill_climbing, stochastic, mini_a_star, multi_objective_optimization, analyze_csp_failure
-from algorithms import csp_task, csp_preferences, create_preference_task
+from algorithms import csp_task, csp_preferences, create_preference_task, build_emotion_index
 from emotion_detector import start_camera
 from default_tasks import get_default_mood_tasks
 
@@ -181,15 +184,11 @@ class TaskManager:
     
     def load_emotion_task_preferences(self):
         """Map which MUST-DO tasks are suitable for which emotions"""
-        preferences = {}
         if not self.todo_tasks:
-            return preferences
+            return {}
         
-        for emotion in SUPPORTED_EMOTIONS:
-            suitable_tasks = [t for t in self.todo_tasks if emotion in t.emotion_fit]
-            if suitable_tasks:
-                preferences[emotion] = suitable_tasks
-        return preferences
+        index = build_emotion_index(self.todo_tasks)
+        return {emotion: index[emotion] for emotion in SUPPORTED_EMOTIONS if emotion in index}
     
     def load_user_preferences_csp(self):
         """Load user's custom preferences for CSP_preferences function"""
@@ -228,22 +227,22 @@ class TaskManager:
 
 def check_time_constraints(pref_task, current_time):
     current_hour = current_time.hour
-    if "allowed_time" in pref_task.constraints:
-        time_info = pref_task.constraints["allowed_time"]
-        if isinstance(time_info, dict):
-            allowed_start = time_info.get("start", 0)
-            allowed_end = time_info.get("end", 24)
-            if allowed_start <= current_hour < allowed_end:
-                 return True, "✅ Within allowed time range."
-            return False, f"❌ Outside allowed range ({allowed_start}:00-{allowed_end}:00)."
+    # Task caches its allowed_time window as plain attributes
+    if pref_task.has_time:
+        allowed_start = pref_task.time_start
+        allowed_end = pref_task.time_end
+        if allowed_start <= current_hour < allowed_end:
+             return True, "✅ Within allowed time range."
+        return False, f"❌ Outside allowed range ({allowed_start}:00-{allowed_end}:00)."
     return True, "✅ No time constraints."
 
 def dynamic_resource_check(pref_task, current_conditions):
-    if "requires" in pref_task.constraints:
-        required = pref_task.constraints["requires"]
-        required = [required] if isinstance(required, str) else required
+    if pref_task.has_requires:
         available = current_conditions.get("available_resources", [])
-        missing = [r for r in required if r not in available]
+        if pref_task.requires_set.issubset(available):
+            return True
+        available_set = set(available)
+        missing = [r for r in pref_task.required_resources if r not in available_set]
         if missing:
             print(f"   Missing: {', '.join(missing)}")
             if input(f"   Have {', '.join(missing)}? (y/n): ").lower() == 'y':
@@ -252,16 +251,27 @@ def dynamic_resource_check(pref_task, current_conditions):
             return False
     return True
 
-def check_preference_tasks_for_emotion(emotion, user_preferences, current_conditions, completed_tasks):
+def check_preference_tasks_for_emotion(emotion, user_preferences, current_conditions, completed_ids,
+                                       limit=None):
+    """
+    Return the preference tasks usable now, best score first (top `limit` only if given).
+    completed_ids is a set of id() values of the tasks already done.
+    """
     available = []
+    current_time = current_conditions["current_time"]
+    current_energy = current_conditions.get("current_energy", 5)
     for task in user_preferences:
-        if emotion in task.emotion_fit and task not in completed_tasks:
+        if emotion in task.emotion_fit and id(task) not in completed_ids:
             if dynamic_resource_check(task, current_conditions):
-                if check_time_constraints(task, current_conditions["current_time"])[0]:
-                    task.compute_score(emotion, current_conditions.get("current_energy", 5))
-                    if getattr(task, 'is_preference', False):
+                if check_time_constraints(task, current_time)[0]:
+                    # compute_score memoizes per task, so repeated emotions
+                    # reuse earlier scores
+                    task.compute_score(emotion, current_time, current_energy=current_energy)
+                    if task.is_preference:
                         task.score += 30.0
                     available.append(task)
+    if limit is not None:
+        return nlargest(limit, available, key=lambda x: x.score)
     available.sort(key=lambda x: x.score, reverse=True)
     return available
 
@@ -280,20 +290,36 @@ def draw_recommendations(frame, tasks, title="Recommended Activities"):
             1
         )
         y += 30
+
+# Rendered recommendation panel, reused until its contents or size change
+_panel_cache = {"key": None, "panel": None}
+
 def draw_recommendation_panel(frame, recommended_tasks):
     h, w, _ = frame.shape
     panel_width = 300
     x_start = w - panel_width
+    if x_start < 0:
+        # Narrower than the panel: draw straight onto the frame
+        render_recommendation_panel(frame, recommended_tasks, x_start)
+        return
+
+    # putText rasterizes every glyph, so the panel is only drawn when the
+    # recommendations change and copied onto each frame otherwise
+    key = (h, w, tuple(task.name for task in recommended_tasks[:5]))
+    if _panel_cache["key"] != key:
+        panel = np.empty_like(frame[:, x_start:])  # Fully painted below
+        render_recommendation_panel(panel, recommended_tasks, 0)
+        _panel_cache["key"] = key
+        _panel_cache["panel"] = panel
+
+    frame[:, x_start:] = _panel_cache["panel"]
 
+def render_recommendation_panel(panel, recommended_tasks, x_start):
     # Panel background
-    cv2.rectangle(frame,
-                  (x_start, 0),
-                  (w, h),
-                  (40, 40, 40),
-                  -1)
+    panel[:, max(x_start, 0):] = (40, 40, 40)
 
     # Title
-    cv2.putText(frame,
+    cv2.putText(panel,
                 "Mood Recommendations",
                 (x_start + 10, 30),
                 cv2.FONT_HERSHEY_SIMPLEX,
@@ -303,7 +329,7 @@ def draw_recommendation_panel(frame, recommended_tasks):
 
     # Tasks
     if not recommended_tasks:
-        cv2.putText(frame,
+        cv2.putText(panel,
                     "No suggestions",
                     (x_start + 10, 70),
                     cv2.FONT_HERSHEY_SIMPLEX,
@@ -314,7 +340,7 @@ def draw_recommendation_panel(frame, recommended_tasks):
 
     for i, task in enumerate(recommended_tasks[:5]):
         y = 70 + i * 35
-        cv2.putText(frame,
+        cv2.putText(panel,
                     f"- {task.name}",
                     (x_start + 10, y),
                     cv2.FONT_HERSHEY_SIMPLEX,
@@ -322,6 +348,64 @@ def draw_recommendation_panel(frame, recommended_tasks):
                     (255, 255, 255),
                     1)
 
+# Rasterized labels keyed by (text, scale, color, thickness)
+_text_cache = {}
+
+def draw_cached_text(frame, text, org, scale, color, thickness):
+    """
+    Same output as cv2.putText with FONT_HERSHEY_SIMPLEX, but each label is
+    rasterized once and later frames only copy its pixels into place
+    """
+    key = (text, scale, color, thickness)
+    entry = _text_cache.get(key)
+    if entry is None:
+        (text_w, text_h), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)
+        pad = 2 * thickness + 2  # Room for stroke width around the text box
+        shape = (text_h + baseline + 2 * pad, text_w + 2 * pad)
+        tile = np.zeros(shape + (3,), np.uint8)
+        mask = np.zeros(shape, np.uint8)
+        cv2.putText(tile, text, (pad, pad + text_h), cv2.FONT_HERSHEY_SIMPLEX, scale, color, thickness)
+        cv2.putText(mask, text, (pad, pad + text_h), cv2.FONT_HERSHEY_SIMPLEX, scale, 255, thickness)
+        on = mask > 0
+        if len(_text_cache) >= 256:
+            _text_cache.clear()  # The countdown produces a new label every second
+        entry = _text_cache[key] = (pad, pad + text_h, on, tile[on])
+    
+    left, top, on, pixels = entry
+    x0 = org[0] - left
+    y0 = org[1] - top
+    y1 = y0 + on.shape[0]
+    x1 = x0 + on.shape[1]
+    if x0 < 0 or y0 < 0 or y1 > frame.shape[0] or x1 > frame.shape[1]:
+        # Partly off-frame: let putText clip it
+        cv2.putText(frame, text, org, cv2.FONT_HERSHEY_SIMPLEX, scale, color, thickness)
+        return
+    frame[y0:y1, x0:x1][on] = pixels
+
+def run_search(selected_algorithm, pool, emotion, current_conditions):
+    """Run the selected search algorithm and return the recommended tasks"""
+    if selected_algorithm == 3:  # CSP
+        recommended_tasks, _ = csp_preferences(pool, current_conditions, limit=5,
+                                               collect_reasons=False)
+        return recommended_tasks
+    elif selected_algorithm == 1:
+        return mini_a_star([], emotion, 0, 3, pool)
+    elif selected_algorithm == 2:
+        best = greedy(pool, emotion, current_conditions)
+    elif selected_algorithm == 4:
+        best = stochastic(pool, emotion)
+    elif selected_algorithm == 5:
+        best = hill_climbing(pool, current_conditions)
+    else:
+        return []
+    return [best] if best else []
+
+def sort_undone_tasks(todo_tasks, completed_ids):
+    """Return the unfinished TODOs, earliest deadline first, then by priority"""
+    undone = [t for t in todo_tasks if id(t) not in completed_ids]
+    undone.sort(key=Task.get_todo_sort_key)
+    return undone
+
 def integrated_task_mode(todo_tasks, mood_activities, emotion_preferences,
                          user_preferences, selected_algorithm,
                          use_deadline_csp=True, use_preference_csp=True):
@@ -334,12 +418,31 @@ def integrated_task_mode(todo_tasks, mood_activities, emotion_preferences,
     interrupted_task = None
     current_task = None
     completed_tasks = []
+    completed_ids = set()
+
+    # The TODO order only changes when a task completes, so it is sorted
+    # here and on completion rather than on every frame
+    undone = sort_undone_tasks(todo_tasks, completed_ids)
 
     task_start_time = None
     remaining_time = 0
 
     last_emotion = "neutral"
     emotion_detection_paused = False
+    last_detect_t = 0.0  # Emotion changes on a scale of seconds, not frames
+    last_clock_t = 0.0
+
+    # CSP, Greedy and Stochastic only recommend tasks that fit the current
+    # emotion, so the pool is indexed by emotion once and they get its
+    # slice; A* and Hill Climbing search the whole pool
+    pool = mood_activities + user_preferences
+    for t in pool:
+        t.is_preference = True
+    emotion_index = build_emotion_index(pool)
+
+    # Searches run on one worker thread; search_future is the pending one
+    search_executor = ThreadPoolExecutor(max_workers=1)
+    search_future = None
 
     current_conditions = {
         "current_time": datetime.now(),
@@ -350,85 +453,81 @@ def integrated_task_mode(todo_tasks, mood_activities, emotion_preferences,
 
     print(f"\n🚀 SYSTEM ACTIVE - ALGO {selected_algorithm}")
 
+    frame = None  # Reused by cap.read() once the first frame sets its size
+
     try:
         while True:
-            ret, frame = cap.read()
+            ret, frame = cap.read(frame)
             if not ret:
                 break
 
-            display = frame.copy()
-            current_conditions["current_time"] = datetime.now()
+            # Overlays are drawn straight onto the fresh frame from
+            # cap.read() (the detector copies any frame it keeps), and the
+            # clock is read at most once a second
+            now_t = time.monotonic()
+            if now_t - last_clock_t >= 1.0:
+                last_clock_t = now_t
+                current_conditions["current_time"] = datetime.now()
 
             # ======================================================
             # 🎭 EMOTION DETECTION → SEARCH ALGORITHMS
             # ======================================================
-            if not emotion_detection_paused:
+            if not emotion_detection_paused and now_t - last_detect_t >= 0.5:
+                last_detect_t = now_t
                 emotion = detector.detect_emotion_from_frame(frame)
 
                 if emotion != last_emotion:
                     last_emotion = emotion
                     current_conditions["current_emotion"] = emotion
+                    current_conditions["current_time"] = datetime.now()
 
                     print(f"🔍 Searching... Emotion: {emotion}")
 
-                    pool = mood_activities + user_preferences
-                    for t in pool:
-                        t.is_preference = True
-
                     # ---------- RUN SEARCH ----------
-                    if selected_algorithm == 3:  # CSP
-                        recommended_tasks, _ = csp_preferences(pool, current_conditions)
-                    elif selected_algorithm == 1:
-                        recommended_tasks = mini_a_star([], emotion, 0, 3, pool)
-                    elif selected_algorithm == 2:
-                        best = greedy(pool, emotion, current_conditions)
-                        recommended_tasks = [best] if best else []
-                    elif selected_algorithm == 4:
-                        best = stochastic(pool, emotion)
-                        recommended_tasks = [best] if best else []
-                    elif selected_algorithm == 5:
-                        best = hill_climbing(pool, current_conditions)
-                        recommended_tasks = [best] if best else []
+                    # In the background, so the camera keeps rendering; only
+                    # the search for the newest emotion is kept
+                    if selected_algorithm in (1, 5):
+                        search_pool = pool
                     else:
-                        recommended_tasks = []
+                        search_pool = emotion_index.get(emotion, [])
+                    search_future = search_executor.submit(
+                        run_search, selected_algorithm, search_pool,
+                        emotion, dict(current_conditions))
 
-                    # ---------- 🔥 AUTO-SHOW BREAK UI ----------
-                    if recommended_tasks and ui_state == "WORKING_TODO":
-                        interrupted_task = current_task
-                        current_task = None
-                        ui_state = "BREAK"
-                        emotion_detection_paused = True
+            if search_future is not None and search_future.done():
+                try:
+                    recommended_tasks = search_future.result()
+                except Exception as e:
+                    print(f"❌ Search failed: {e}")
+                    recommended_tasks = []
+                search_future = None
+
+                # ---------- 🔥 AUTO-SHOW BREAK UI ----------
+                if recommended_tasks and ui_state == "WORKING_TODO":
+                    interrupted_task = current_task
+                    current_task = None
+                    ui_state = "BREAK"
+                    emotion_detection_paused = True
 
 
             # ======================================================
             # 📋 TODO SELECTION
             # ======================================================
             if ui_state == "TODO_SELECTION":
-                undone = [t for t in todo_tasks if t not in completed_tasks]
-
                 if undone:
-                    undone.sort(
-                        key=lambda t: (
-                            t.deadline if t.deadline else "9999-12-31",
-                            -t.base_priority
-                        )
-                    )
-
-                    cv2.putText(display,
-                                f"Next TODO: {undone[0].name}",
-                                (10, 50),
-                                cv2.FONT_HERSHEY_SIMPLEX,
-                                0.7,
-                                (0, 255, 255),
-                                2)
-
-                    cv2.putText(display,
-                                "S: Start  |  Q: Quit",
-                                (10, 80),
-                                cv2.FONT_HERSHEY_SIMPLEX,
-                                0.6,
-                                (200, 200, 200),
-                                1)
+                    draw_cached_text(frame,
+                                     f"Next TODO: {undone[0].name}",
+                                     (10, 50),
+                                     0.7,
+                                     (0, 255, 255),
+                                     2)
+
+                    draw_cached_text(frame,
+                                     "S: Start  |  Q: Quit",
+                                     (10, 80),
+                                     0.6,
+                                     (200, 200, 200),
+                                     1)
 
             # ======================================================
             # ⏳ WORKING ON TODO (COUNTDOWN)
@@ -439,24 +538,24 @@ def integrated_task_mode(todo_tasks, mood_activities, emotion_preferences,
 
                 m, s = divmod(int(remaining_time), 60)
 
-                cv2.putText(display,
-                            f"⏳ {m:02d}:{s:02d}",
-                            (10, 50),
-                            cv2.FONT_HERSHEY_SIMPLEX,
-                            1,
-                            (0, 0, 255),
-                            2)
-
-                cv2.putText(display,
-                            "B: Take Break",
-                            (10, 90),
-                            cv2.FONT_HERSHEY_SIMPLEX,
-                            0.6,
-                            (255, 255, 255),
-                            1)
+                draw_cached_text(frame,
+                                 f"⏳ {m:02d}:{s:02d}",
+                                 (10, 50),
+                                 1,
+                                 (0, 0, 255),
+                                 2)
+
+                draw_cached_text(frame,
+                                 "B: Take Break",
+                                 (10, 90),
+                                 0.6,
+                                 (255, 255, 255),
+                                 1)
 
                 if remaining_time <= 0:
                     completed_tasks.append(current_task)
+                    completed_ids.add(id(current_task))
+                    undone = sort_undone_tasks(todo_tasks, completed_ids)
                     print(f"✅ Completed TODO: {current_task.name}")
                     current_task = None
                     ui_state = "TODO_SELECTION"
@@ -465,54 +564,46 @@ def integrated_task_mode(todo_tasks, mood_activities, emotion_preferences,
             # 🧘 BREAK MODE
             # ======================================================
             if ui_state == "BREAK":
-                cv2.putText(display,
-                            "Break Suggestions (1–3):",
-                            (10, 50),
-                            cv2.FONT_HERSHEY_SIMPLEX,
-                            0.7,
-                            (0, 255, 0),
-                            2)
+                draw_cached_text(frame,
+                                 "Break Suggestions (1–3):",
+                                 (10, 50),
+                                 0.7,
+                                 (0, 255, 0),
+                                 2)
 
                 for i, task in enumerate(recommended_tasks[:3], 1):
-                    cv2.putText(display,
-                                f"{i}. {task.name} ({task.duration}m)",
-                                (10, 50 + i * 30),
-                                cv2.FONT_HERSHEY_SIMPLEX,
-                                0.6,
-                                (255, 255, 255),
-                                1)
+                    draw_cached_text(frame,
+                                     f"{i}. {task.name} ({task.duration}m)",
+                                     (10, 50 + i * 30),
+                                     0.6,
+                                     (255, 255, 255),
+                                     1)
 
             # ======================================================
             # 🖥️ DISPLAY
             # ======================================================
-            cv2.putText(display,
-                        f"Emotion: {last_emotion.upper()}",
-                        (10, display.shape[0] - 20),
-                        cv2.FONT_HERSHEY_SIMPLEX,
-                        0.5,
-                        (255, 255, 255),
-                        1)
+            draw_cached_text(frame,
+                             f"Emotion: {last_emotion.upper()}",
+                             (10, frame.shape[0] - 20),
+                             0.5,
+                             (255, 255, 255),
+                             1)
 
-            draw_recommendation_panel(display, recommended_tasks)
-            cv2.imshow("Emotion Task Optimizer", display)
+            draw_recommendation_panel(frame, recommended_tasks)
+            cv2.imshow("Emotion Task Optimizer", frame)
 
             # ======================================================
             # ⌨️ KEY HANDLING
             # ======================================================
-            key = cv2.waitKey(1) & 0xFF
+            # Only the countdown animates; the selection and break screens
+            # can wait a whole camera frame for input and save the CPU
+            key = cv2.waitKey(1 if ui_state == "WORKING_TODO" else 33) & 0xFF
 
             if key == ord('q'):
                 break
 
             if ui_state == "TODO_SELECTION" and key == ord('s'):
-                undone = [t for t in todo_tasks if t not in completed_tasks]
                 if undone:
-                    undone.sort(
-                        key=lambda t: (
-                            t.deadline if t.deadline else "9999-12-31",
-                            -t.base_priority
-                        )
-                    )
                     current_task = undone[0]
                     task_start_time = time.time()
                     ui_state = "WORKING_TODO"
@@ -541,6 +632,8 @@ def integrated_task_mode(todo_tasks, mood_activities, emotion_preferences,
                     emotion_detection_paused = False
 
     finally:
+        search_executor.shutdown(wait=False)
+        detector.close()
         cap.release()
         cv2.destroyAllWindows()
 
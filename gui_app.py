@@ -3,26 +3,34 @@ import customtkinter as ctk
 import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
+import math
 import pickle
 import os
 import sys
 from datetime import datetime, timedelta
 import time
-import cv2
+from collections import OrderedDict
 from PIL import Image, ImageTk
-import numpy as np
 
 # Import backend modules
 sys.path.append('.')
 from task import Task
 from default_tasks import get_default_mood_tasks
 from algorithms import (create_preference_task, csp_preferences, mini_a_star, 
-                        greedy, stochastic, hill_climbing, csp_task)
+                        greedy, stochastic, hill_climbing, csp_task, build_emotion_index)
 
 # Set appearance and color theme
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("blue")
 
+LOADING_STATUS = "Status: Loading detector…"
+
+# Emotions offered as checkboxes, in display order
+EMOTIONS = ("sad", "happy", "neutral", "fear", "surprise", "disgust", "angry")
+
+# Every MM:SS under an hour, formatted once for the timer ticks
+UNDER_HOUR_TIMES = tuple(f"00:{m:02d}:{s:02d}" for m in range(60) for s in range(60))
+
 class TaskOptimizerGUI(ctk.CTk):
     def __init__(self):
         super().__init__()
@@ -32,13 +40,48 @@ class TaskOptimizerGUI(ctk.CTk):
         
         # Initialize camera and detector
         self.cap = None
-        self.detector = None  # Will be initialized when needed
+        self.detector = None  # Set by the loader thread once ready
+        self.detector_loading = False
         self.camera_running = False
+        self.monitoring = False  # Set while the emotion monitor thread runs
+        
+        # A capture thread keeps only the newest camera frame here, for the
+        # emotion monitor, along with its preview image for the Tk thread
+        self.capture_thread = None
+        self.frame_lock = threading.Lock()
+        self.frame_ready = threading.Event()
+        self.latest_frame = None
+        self.latest_preview = None
+        self.latest_frame_time = 0.0
+        self.shown_frame_time = 0.0
+        
+        # One PhotoImage that both camera labels show is repainted in place
+        self.camera_photo = None
+        self.camera_photo_shown = False  # Whether the labels show camera_photo
+        self.camera_interval_ms = 66  # About 15 preview frames per second
+        self.camera_tick = None  # after() id of the pending update_camera call
+        self.preview_pending = False  # A painted frame Tk has not drawn yet
+        
         self.current_emotion = "neutral"
         self.last_emotion = "neutral"  # Track previous emotion
         self.last_algo_update = 0
         self.recommendation_results = []
+        
+        # Mood-task recommendations by (algorithm, emotion, pool, resources,
+        # hour, day), least recently used first; each entry also holds its
+        # pool so the task ids in the key stay unique
+        self.rec_cache = OrderedDict()
+        self.rec_cache_size = 64
+        self.pending_rec_update = None  # after() id of the debounced panel refresh
+        self.fonts = {}  # CTkFont per option set, shared by every widget using it
+        
+        # Checked mood activities plus preferences, with preference flags set;
+        # None until rebuilt after a checkbox or preference change
+        self.unified_pool = None
+        self.unified_pool_key = ()
+        self.pool_by_emotion = {}  # unified_pool split by emotion_fit
         self.last_emotion_seen = None
+        self.rendered_emotion = None  # Emotion the labels currently show
 
         # Initialize data
         self.todo_tasks = []
@@ -47,6 +90,10 @@ class TaskOptimizerGUI(ctk.CTk):
         self.algorithm_choice = ctk.IntVar(value=3)  # Default to CSP
         self.use_deadline_warnings = ctk.BooleanVar(value=True)
         
+        # Text of the labels laid over the camera previews
+        self.overlay_emotion = ctk.StringVar(value=f"Emotion: {self.current_emotion}")
+        self.emotion_overlays = []
+        
         # Session State
         self.is_session_active = False
         self.active_task = None
@@ -55,6 +102,7 @@ class TaskOptimizerGUI(ctk.CTk):
         self.task_start_time = 0
         self.task_elapsed_before_pause = 0  # Track elapsed time before pause
         self.completed_tasks = []
+        self.completed_ids = set()  # id() of every task in completed_tasks
         self.break_suggestion_active = False
         self.suggested_break_task = None
         
@@ -62,13 +110,16 @@ class TaskOptimizerGUI(ctk.CTk):
         self.todo_timer_running = False
         self.todo_time_remaining = 0  # in seconds
         self.todo_total_duration = 0  # in seconds
+        self.todo_end_time = 0.0  # time.monotonic() at which the todo timer runs out
         self.break_timer_running = False
         self.break_time_remaining = 0  # in seconds
+        self.break_end_time = 0.0
+        self.timer_tick = None  # after() id of the tick that drives both timers
         
         # Resources from entry
         self.available_resources = ["computer", "internet", "water"]
         
-        # Create detector only when needed
+        # Load the detector in the background while the UI is built
         self.create_detector()
         
         # Grid configuration - 3 columns: sidebar, main, recommendations
@@ -76,12 +127,34 @@ class TaskOptimizerGUI(ctk.CTk):
         self.grid_columnconfigure(2, weight=0)  # Recommendations panel
         self.grid_rowconfigure(0, weight=1)
 
-        # Initialize UI components first
+        # Initialize UI components first; the update methods test these
+        # against None, since some run before every tab is built
         self.sidebar_frame = None
         self.logo_label = None
         self.sidebar_status = None
         self.tabview = None
         self.recommendations_frame = None
+        self.recommendation_container = None
+        self.recommendation_emotion_label = None
+        self.recommendation_algo_label = None
+        self.stats_widgets = None
+        self.algo_label = None
+        self.task_list_container = None
+        self.pref_list_container = None
+        self.task_rows = {}  # id(task) -> (task, row frame) in the task list
+        self.pref_rows = {}  # id(pref) -> (pref, row frame) in the preference list
+        self.mood_vars = []
+        self.camera_btn = None
+        self.camera_label = None
+        self.emotion_label = None
+        self.resources_entry = None
+        self.start_emotion_label = None
+        self.session_title = None
+        self.timer_label = None
+        self.session_camera_label = None
+        self.session_emotion_label = None
+        self.active_task_name = None
+        self.active_task_details = None
         
         # Setup the UI
         self.setup_ui()
@@ -95,7 +168,7 @@ class TaskOptimizerGUI(ctk.CTk):
 
         # Logo and title
         self.logo_label = ctk.CTkLabel(self.sidebar_frame, text="Emotion Task Optimizer", 
-                                      font=ctk.CTkFont(size=18, weight="bold"))
+                                      font=self.get_font(size=18, weight="bold"))
         self.logo_label.grid(row=0, column=0, padx=20, pady=(30, 10))
         
         # Navigation buttons
@@ -116,9 +189,11 @@ class TaskOptimizerGUI(ctk.CTk):
             btn.grid(row=i, column=0, padx=15, pady=5, sticky="ew")
         
         # Status label
-        self.sidebar_status = ctk.CTkLabel(self.sidebar_frame, text="Status: Ready", 
-                                          text_color="gray", font=ctk.CTkFont(size=12))
+        status = LOADING_STATUS if self.detector_loading else "Status: Ready"
+        self.sidebar_status = ctk.CTkLabel(self.sidebar_frame, text=status, 
+                                          text_color="gray", font=self.get_font(size=12))
         self.sidebar_status.grid(row=7, column=0, padx=20, pady=20)
+        self.check_detector_loaded()
         
         # Main Tabview (middle)
         self.tabview = ctk.CTkTabview(self, width=250)
@@ -152,14 +227,39 @@ class TaskOptimizerGUI(ctk.CTk):
         # Start emotion monitoring thread
         self.start_emotion_monitoring()
 
+    def get_font(self, **options):
+        """Return the shared CTkFont for these options, creating it on first use"""
+        key = tuple(sorted(options.items()))
+        font = self.fonts.get(key)
+        if font is None:
+            font = self.fonts[key] = ctk.CTkFont(**options)
+        return font
+
     def create_detector(self):
-        """Create emotion detector on demand"""
+        """Start loading the emotion detector on a background thread"""
+        # Importing emotion_detector loads FER and its deep learning backend,
+        # which takes seconds; the monitor loop skips frames until it is set
+        self.detector_loading = True
+        threading.Thread(target=self.load_detector, daemon=True).start()
+
+    def load_detector(self):
+        """Loader thread: import and create the emotion detector"""
         try:
             from emotion_detector import EmotionDetector
-            self.detector = EmotionDetector()
+            # Inference in a child process keeps the Tk main loop responsive
+            self.detector = EmotionDetector(use_process=True)
         except Exception as e:
             print(f"Warning: Could not initialize emotion detector: {e}")
             self.detector = None
+        self.detector_loading = False
+
+    def check_detector_loaded(self):
+        """Clear the loading status once the loader thread is done"""
+        if self.detector_loading:
+            self.after(500, self.check_detector_loaded)
+        elif self.sidebar_status.cget("text") == LOADING_STATUS:
+            # Leave any status set meanwhile (e.g. a started session) alone
+            self.sidebar_status.configure(text="Status: Ready", text_color="gray")
 
     def start_emotion_monitoring(self):
         """Start thread to monitor emotion changes"""
@@ -169,42 +269,95 @@ class TaskOptimizerGUI(ctk.CTk):
 
     def emotion_monitor_loop(self):
         """Monitor for emotion changes and update recommendations"""
-        while getattr(self, 'monitoring', True):
-            if self.detector and self.camera_running and self.cap:
-                try:
-                    ret, frame = self.cap.read()
-                    if ret:
-                        emotion = self.detector.detect_emotion_from_frame(frame)
-                        
-                        # Only update if emotion actually changed
-                        if emotion != self.current_emotion:
-                            self.current_emotion = emotion
-                            self.last_emotion_seen = emotion
-                            
-                            # Update UI labels
-                            self.after(0, self.update_emotion_labels, emotion)
-                            
-                            # Update recommendations if session is active
-                            if self.is_session_active:
-                                self.after(0, self.update_recommendations_panel)
-                except Exception as e:
-                    print(f"Error in emotion detection: {e}")
-                    pass
+        last_frame_time = 0.0
+        while self.monitoring:
+            # Wake as soon as the capture thread has a new frame (or on
+            # shutdown); the detector itself limits how often inference runs
+            if not self.frame_ready.wait(timeout=0.5):
+                continue
+            self.frame_ready.clear()
+            if not (self.detector and self.camera_running and self.cap):
+                continue
             
-            time.sleep(1)  # Check every second
+            with self.frame_lock:
+                frame = self.latest_frame
+                frame_time = self.latest_frame_time
+            if frame is None or frame_time == last_frame_time:
+                continue
+            last_frame_time = frame_time
+            
+            try:
+                self.detector.detect_emotion_from_frame(frame)
+                
+                # Vote over the last few detections so one misread frame
+                # does not rebuild the recommendations twice
+                emotion = self.detector.get_recent_majority(5)
+                
+                # Only update if emotion actually changed
+                if emotion != self.current_emotion:
+                    self.current_emotion = emotion
+                    self.last_emotion_seen = emotion
+                    
+                    # Update UI labels
+                    self.after_idle(self.update_emotion_labels, emotion)
+                    
+                    # Update recommendations if session is active
+                    if self.is_session_active:
+                        self.after_idle(self.schedule_recommendations_update)
+            except Exception as e:
+                print(f"Error in emotion detection: {e}")
+                pass
+
+    def capture_loop(self, cap):
+        """Capture thread: keep the newest frame from cap, and its preview image"""
+        import cv2
+        while True:
+            ret, frame = cap.read()
+            if ret:
+                # The preview image is made here rather than on the Tk thread
+                # (OpenCV releases the GIL while it converts); resizing first
+                # means only the preview size is converted, and a 640x480
+                # camera needs no resize at all
+                small = frame if frame.shape[:2] == (480, 640) else cv2.resize(frame, (640, 480))
+                preview = Image.fromarray(cv2.cvtColor(small, cv2.COLOR_BGR2RGB))
+            
+            with self.frame_lock:
+                # Whether to go on is decided under the lock, so start_camera
+                # can resume a paused thread that is still in a read, and
+                # release_camera can leave the release to it
+                if not (ret and self.camera_running and self.cap is cap):
+                    if self.capture_thread is threading.current_thread():
+                        self.capture_thread = None
+                    release = self.cap is not cap
+                    break
+                self.latest_frame = frame
+                self.latest_preview = preview
+                self.latest_frame_time = time.monotonic()
+            self.frame_ready.set()
+        
+        if release:
+            cap.release()  # Handed over by release_camera during the read
 
     def update_emotion_labels(self, emotion):
         """Update all emotion labels in the UI"""
-        if hasattr(self, 'emotion_label') and self.emotion_label:
+        if emotion == self.rendered_emotion:
+            return
+        self.rendered_emotion = emotion
+        
+        if self.emotion_label is not None:
             self.emotion_label.configure(text=f"Emotion: {emotion.upper()}")
-        if hasattr(self, 'start_emotion_label') and self.start_emotion_label:
+        if self.start_emotion_label is not None:
             self.start_emotion_label.configure(text=f"Current Emotion: {emotion.upper()}", text_color="#1abc9c")
-        if hasattr(self, 'session_emotion_label') and self.session_emotion_label:
+        if self.session_emotion_label is not None:
             self.session_emotion_label.configure(text=f"Feeling: {emotion.upper()}", text_color="#1abc9c")
-        if hasattr(self, 'recommendation_emotion_label') and self.recommendation_emotion_label:
+        if self.recommendation_emotion_label is not None:
             self.recommendation_emotion_label.configure(text=f"Current Mood: {emotion.upper()}", text_color="#1abc9c")
         
-        self.update_stats()
+        self.overlay_emotion.set(f"Emotion: {emotion}")
+        
+        # The other dashboard stats are refreshed where the task lists change
+        if self.stats_widgets is not None and 'Current Emotion' in self.stats_widgets:
+            self.stats_widgets['Current Emotion'].configure(text=emotion)
 
     def setup_recommendations_panel(self):
         """Setup the right-side recommendations panel"""
@@ -214,20 +367,20 @@ class TaskOptimizerGUI(ctk.CTk):
         
         # Title
         title = ctk.CTkLabel(self.recommendations_frame, text="✨ Recommendations", 
-                            font=ctk.CTkFont(size=20, weight="bold"))
+                            font=self.get_font(size=20, weight="bold"))
         title.pack(pady=(20, 10), padx=20)
         
         # Current emotion display
         self.recommendation_emotion_label = ctk.CTkLabel(self.recommendations_frame, 
                                                          text="Current Mood: neutral",
-                                                         font=ctk.CTkFont(size=16),
+                                                         font=self.get_font(size=16),
                                                          text_color="#1abc9c")
         self.recommendation_emotion_label.pack(pady=(0, 20), padx=20)
         
         # Algorithm info
         self.recommendation_algo_label = ctk.CTkLabel(self.recommendations_frame,
                                                      text="Algorithm: CSP",
-                                                     font=ctk.CTkFont(size=12),
+                                                     font=self.get_font(size=12),
                                                      text_color="gray")
         self.recommendation_algo_label.pack(pady=(0, 10), padx=20)
         
@@ -239,27 +392,50 @@ class TaskOptimizerGUI(ctk.CTk):
         self.recommendations_scroll = ctk.CTkScrollableFrame(self.recommendations_frame, height=600)
         self.recommendations_scroll.pack(fill="both", expand=True, padx=20, pady=(0, 20))
         
-        # Initial message
+        # Message, heading and recommendation cards are created once and
+        # reconfigured on every refresh instead of being rebuilt
         self.recommendation_container = self.recommendations_scroll
+        self.rec_message_label = ctk.CTkLabel(self.recommendation_container,
+                                              text="",
+                                              text_color="gray",
+                                              justify="center")
+        self.rec_heading_label = ctk.CTkLabel(self.recommendation_container,
+                                              text="",
+                                              font=self.get_font(size=14, weight="bold"))
+        self.rec_slots = [self.create_recommendation_slot() for _ in range(5)]
+        
+        # Initial message
         self.show_no_recommendations_message()
 
     def show_no_recommendations_message(self):
         """Show message when no recommendations available"""
-        if not hasattr(self, 'recommendation_container'):
+        if self.recommendation_container is None:
             return
             
-        for widget in self.recommendation_container.winfo_children():
-            widget.destroy()
-        
-        label = ctk.CTkLabel(self.recommendation_container, 
-                            text="No recommendations yet.\nStart a session and emotions will trigger suggestions.",
-                            text_color="gray",
-                            justify="center")
-        label.pack(pady=50)
+        self.hide_recommendation_widgets()
+        self.rec_message_label.configure(
+            text="No recommendations yet.\nStart a session and emotions will trigger suggestions.")
+        self.rec_message_label.pack(pady=50)
+
+    def hide_recommendation_widgets(self):
+        """Unpack the message, heading and every recommendation card"""
+        for widget in [self.rec_message_label, self.rec_heading_label] + [slot["frame"] for slot in self.rec_slots]:
+            widget.pack_forget()
+
+    def schedule_recommendations_update(self, delay_ms=750):
+        """Refresh the recommendations panel once a burst of emotion changes settles"""
+        if self.pending_rec_update is not None:
+            self.after_cancel(self.pending_rec_update)
+        self.pending_rec_update = self.after(delay_ms, self.run_scheduled_recommendations_update)
+
+    def run_scheduled_recommendations_update(self):
+        """Run the debounced panel refresh"""
+        self.pending_rec_update = None
+        self.update_recommendations_panel()
 
     def update_recommendations_panel(self):
         """Update the recommendations panel with current algorithm results"""
-        if not hasattr(self, 'recommendation_container'):
+        if self.recommendation_container is None:
             return
             
         if not self.is_session_active or not self.current_emotion:
@@ -277,62 +453,46 @@ class TaskOptimizerGUI(ctk.CTk):
             4: "Stochastic",
             5: "Hill Climbing"
         }
-        if hasattr(self, 'recommendation_algo_label'):
-            self.recommendation_algo_label.configure(
+        if self.recommendation_algo_label is not None:
+            self.set_label(self.recommendation_algo_label,
                 text=f"Algorithm: {algo_map.get(self.algorithm_choice.get(), 'CSP')}"
             )
         
         # Clear current recommendations
-        for widget in self.recommendation_container.winfo_children():
-            widget.destroy()
+        self.hide_recommendation_widgets()
         
         if not recommendations:
-            ctk.CTkLabel(self.recommendation_container, 
-                        text=f"No mood tasks for '{self.current_emotion}' emotion.",
-                        text_color="gray").pack(pady=20)
+            self.rec_message_label.configure(text=f"No mood tasks for '{self.current_emotion}' emotion.")
+            self.rec_message_label.pack(pady=20)
             return
         
         # Show recommendations
-        ctk.CTkLabel(self.recommendation_container,
-                    text=f"Suggested for {self.current_emotion}:",
-                    font=ctk.CTkFont(size=14, weight="bold")).pack(pady=(0, 10))
+        self.rec_heading_label.configure(text=f"Suggested for {self.current_emotion}:")
+        self.rec_heading_label.pack(pady=(0, 10))
         
-        for i, task in enumerate(recommendations[:5], 1):  # Show top 5
-            self.create_recommendation_widget(task, i)
+        for slot, task in zip(self.rec_slots, recommendations[:5]):  # Show top 5
+            self.fill_recommendation_slot(slot, task)
+            slot["frame"].pack(fill="x", padx=5, pady=5)
 
-    def create_recommendation_widget(self, task, index):
-        """Create a recommendation widget with action button"""
-        if not hasattr(self, 'recommendation_container'):
-            return
-            
+    def create_recommendation_slot(self):
+        """Create an empty recommendation card; fill_recommendation_slot shows a task in it"""
         frame = ctk.CTkFrame(self.recommendation_container, 
                             fg_color="#2a2a2a",
                             border_width=1,
                             border_color="#444")
-        frame.pack(fill="x", padx=5, pady=5)
         
         # Algorithm badge and Sequence pos
         badge_frame = ctk.CTkFrame(frame, fg_color="transparent")
         badge_frame.pack(fill="x", padx=10, pady=(5, 0))
         
-        algo_tag = getattr(task, 'recommended_by', "AI")
-        badge_color = "#3498db" # Default blue
-        if algo_tag == "CSP": badge_color = "#9b59b6" # Purple
-        elif algo_tag == "A*": badge_color = "#f1c40f" # Yellow/Gold
-        elif algo_tag == "Greedy": badge_color = "#2ecc71" # Green
-        elif algo_tag == "Hill Climb": badge_color = "#e74c3c" # Red
-        
-        tag_label = ctk.CTkLabel(badge_frame, text=f" {algo_tag} ", 
-                               font=ctk.CTkFont(size=10, weight="bold"),
-                               fg_color=badge_color, text_color="white", corner_radius=4)
+        tag_label = ctk.CTkLabel(badge_frame, text="", 
+                               font=self.get_font(size=10, weight="bold"),
+                               fg_color="#3498db", text_color="white", corner_radius=4)
         tag_label.pack(side="left")
         
-        if hasattr(task, 'sequence_pos'):
-            pos_labels = {1: "1st Suggestion", 2: "2nd Suggestion", 3: "3rd Suggestion"}
-            pos_label = ctk.CTkLabel(badge_frame, text=f"  {pos_labels.get(task.sequence_pos, f'Pos {task.sequence_pos}')}", 
-                                   font=ctk.CTkFont(size=10, slant="italic"),
-                                   text_color="gray")
-            pos_label.pack(side="left")
+        pos_label = ctk.CTkLabel(badge_frame, text="", 
+                               font=self.get_font(size=10, slant="italic"),
+                               text_color="gray")
         
         # Task info
         info_frame = ctk.CTkFrame(frame, fg_color="transparent")
@@ -340,26 +500,63 @@ class TaskOptimizerGUI(ctk.CTk):
         
         # Task name and duration
         name_label = ctk.CTkLabel(info_frame, 
-                                 text=f"{task.name}",
-                                 font=ctk.CTkFont(size=14, weight="bold"),
+                                 text="",
+                                 font=self.get_font(size=14, weight="bold"),
                                  anchor="w",
                                  justify="left")
         name_label.pack(anchor="w")
         
-        # Duration and emotion fit
-        details = f"⏱️ {task.duration} min"
-        if hasattr(task, 'emotion_fit') and task.emotion_fit:
-            emotions = ", ".join(task.emotion_fit[:3])
-            details += f" | 😊 {emotions}"
-        
         details_label = ctk.CTkLabel(info_frame, 
-                                    text=details,
+                                    text="",
                                     text_color="gray",
                                     anchor="w",
                                     justify="left")
         details_label.pack(anchor="w", pady=(2, 0))
         
+        req_label = ctk.CTkLabel(info_frame,
+                               text="",
+                               text_color="lightblue",
+                               font=self.get_font(size=11),
+                               anchor="w")
+        
+        # Action button
+        btn_frame = ctk.CTkFrame(frame, fg_color="transparent")
+        btn_frame.pack(fill="x", padx=10, pady=(0, 10))
+        
+        action_btn = ctk.CTkButton(btn_frame, text="", height=35)
+        action_btn.pack(fill="x")
+        
+        return {"frame": frame, "tag": tag_label, "pos": pos_label, "name": name_label,
+                "details": details_label, "requires": req_label, "button": action_btn}
+
+    def fill_recommendation_slot(self, slot, task):
+        """Show a recommended task in a recommendation card"""
+        algo_tag = getattr(task, 'recommended_by', "AI")
+        badge_color = "#3498db" # Default blue
+        if algo_tag == "CSP": badge_color = "#9b59b6" # Purple
+        elif algo_tag == "A*": badge_color = "#f1c40f" # Yellow/Gold
+        elif algo_tag == "Greedy": badge_color = "#2ecc71" # Green
+        elif algo_tag == "Hill Climb": badge_color = "#e74c3c" # Red
+        slot["tag"].configure(text=f" {algo_tag} ", fg_color=badge_color)
+        
+        if hasattr(task, 'sequence_pos'):
+            pos_labels = {1: "1st Suggestion", 2: "2nd Suggestion", 3: "3rd Suggestion"}
+            slot["pos"].configure(text=f"  {pos_labels.get(task.sequence_pos, f'Pos {task.sequence_pos}')}")
+            slot["pos"].pack(side="left")
+        else:
+            slot["pos"].pack_forget()
+        
+        slot["name"].configure(text=f"{task.name}")
+        
+        # Duration and emotion fit
+        details = f"⏱️ {task.duration} min"
+        if hasattr(task, 'emotion_fit') and task.emotion_fit:
+            emotions = ", ".join(task.emotion_fit[:3])
+            details += f" | 😊 {emotions}"
+        slot["details"].configure(text=details)
+        
         # Constraints info
+        req_text = ""
         if hasattr(task, 'constraints'):
             constraints = task.constraints
             if "requires" in constraints:
@@ -368,17 +565,11 @@ class TaskOptimizerGUI(ctk.CTk):
                     req_text = ", ".join(req)
                 else:
                     req_text = str(req)
-                if req_text:
-                    req_label = ctk.CTkLabel(info_frame,
-                                           text=f"📦 Requires: {req_text}",
-                                           text_color="lightblue",
-                                           font=ctk.CTkFont(size=11),
-                                           anchor="w")
-                    req_label.pack(anchor="w", pady=(2, 0))
-        
-        # Action button
-        btn_frame = ctk.CTkFrame(frame, fg_color="transparent")
-        btn_frame.pack(fill="x", padx=10, pady=(0, 10))
+        if req_text:
+            slot["requires"].configure(text=f"📦 Requires: {req_text}")
+            slot["requires"].pack(anchor="w", pady=(2, 0))
+        else:
+            slot["requires"].pack_forget()
         
         # Only show "Take Break" button if we're currently working on a todo task
         if self.active_task and hasattr(self.active_task, 'task_type') and self.active_task.task_type == "must_do":
@@ -392,13 +583,10 @@ class TaskOptimizerGUI(ctk.CTk):
             btn_color = "#1abc9c"  # Green for regular start
             hover_color = "#16a085"
         
-        action_btn = ctk.CTkButton(btn_frame,
-                                  text=btn_text,
-                                  command=btn_command,
-                                  fg_color=btn_color,
-                                  hover_color=hover_color,
-                                  height=35)
-        action_btn.pack(fill="x")
+        slot["button"].configure(text=btn_text,
+                                 command=btn_command,
+                                 fg_color=btn_color,
+                                 hover_color=hover_color)
 
     def start_break_task(self, task):
         """Start a mood-changing task from recommendations"""
@@ -427,20 +615,18 @@ class TaskOptimizerGUI(ctk.CTk):
         # Start break timer
         self.start_break_timer(task.duration * 60)  # Convert minutes to seconds
         
-        # Stop emotion detection during break
+        # Stop emotion detection during break; the device stays open so
+        # resuming does not pay for reopening and re-exposing it
         if self.camera_running:
-            self.camera_running = False
-            if self.cap:
-                self.cap.release()
-                self.cap = None
+            self.pause_camera()
         
         # Update UI
         self.tabview.set("Active Session")
-        if hasattr(self, 'active_task_name'):
+        if self.active_task_name is not None:
             self.active_task_name.configure(text=f"Break: {self.active_task.name}")
-        if hasattr(self, 'active_task_details'):
+        if self.active_task_details is not None:
             self.active_task_details.configure(text=f"Goal: Relax | Duration: {self.active_task.duration}min")
-        if hasattr(self, 'session_emotion_label'):
+        if self.session_emotion_label is not None:
             self.session_emotion_label.configure(text="Feeling: ON BREAK", text_color="#e67e22")
         
         # Update timer display
@@ -459,38 +645,49 @@ class TaskOptimizerGUI(ctk.CTk):
         self.todo_time_remaining = self.todo_total_duration
         
         # Start the timer loop
+        self.resume_todo_timer()
+
+    def resume_todo_timer(self):
+        """Run the todo timer from its current remaining time"""
+        self.todo_timer_running = True
+        self.todo_end_time = time.monotonic() + self.todo_time_remaining
         self.update_todo_timer()
+        self.schedule_timer_tick()
 
     def stop_todo_timer(self):
         """Stop the todo timer"""
+        if self.todo_timer_running:
+            self.todo_time_remaining = max(0, math.ceil(self.todo_end_time - time.monotonic()))
         self.todo_timer_running = False
 
     def update_todo_timer(self):
         """Update the todo timer countdown"""
         if self.todo_timer_running and self.todo_time_remaining > 0:
-            self.todo_time_remaining -= 1
+            # Remaining time is read off the monotonic clock, so the jitter
+            # of each after() call does not add up over a long task; it is
+            # rounded up, so the full duration shows and 0 means time is up
+            previous = self.todo_time_remaining
+            self.todo_time_remaining = max(0, math.ceil(self.todo_end_time - time.monotonic()))
             
-            # Update display
-            self.update_timer_display()
+            # Update display when the shown second changes
+            if self.todo_time_remaining != previous:
+                self.update_timer_display()
             
             # Check if timer finished
             if self.todo_time_remaining <= 0:
                 self.todo_timer_complete()
-            else:
-                # Schedule next update in 1 second
-                self.after(1000, self.update_todo_timer)
         elif self.todo_time_remaining <= 0:
             self.todo_timer_complete()
 
     def todo_timer_complete(self):
         """Handle todo timer completion"""
         self.todo_timer_running = False
-        if hasattr(self, 'timer_label'):
+        if self.timer_label is not None:
             self.timer_label.configure(text="00:00:00", text_color="red")
         
         # Mark task as completed
         if self.active_task:
-            self.completed_tasks.append(self.active_task)
+            self.mark_task_completed(self.active_task)
             messagebox.showinfo("Task Complete", f"Time's up! Completed: {self.active_task.name}")
             
             # Move to next task
@@ -500,31 +697,53 @@ class TaskOptimizerGUI(ctk.CTk):
         """Start countdown timer for break task"""
         self.break_timer_running = True
         self.break_time_remaining = duration_seconds
+        self.break_end_time = time.monotonic() + duration_seconds
         
         # Start the timer loop
         self.update_break_timer()
+        self.schedule_timer_tick()
 
     def stop_break_timer(self):
         """Stop the break timer"""
+        if self.break_timer_running:
+            self.break_time_remaining = max(0, math.ceil(self.break_end_time - time.monotonic()))
         self.break_timer_running = False
 
     def update_break_timer(self):
         """Update the break timer countdown"""
         if self.break_timer_running and self.break_time_remaining > 0:
-            self.break_time_remaining -= 1
+            previous = self.break_time_remaining
+            self.break_time_remaining = max(0, math.ceil(self.break_end_time - time.monotonic()))
             
-            # Update display
-            self.update_timer_display()
+            # Update display when the shown second changes
+            if self.break_time_remaining != previous:
+                self.update_timer_display()
             
             # Check if timer finished
             if self.break_time_remaining <= 0:
                 self.break_timer_complete()
-            else:
-                # Schedule next update in 1 second
-                self.after(1000, self.update_break_timer)
         elif self.break_time_remaining <= 0:
             self.break_timer_complete()
 
+    def schedule_timer_tick(self):
+        """Queue the next timer tick unless one is already pending"""
+        # One after() loop drives both timers, so stopping and restarting a
+        # timer never leaves a second countdown chain running
+        if self.timer_tick is None:
+            self.timer_tick = self.after(250, self.tick_timers)
+
+    def tick_timers(self):
+        """Advance whichever timers are running, then queue the next tick"""
+        self.timer_tick = None
+        if self.break_timer_running:
+            self.update_break_timer()
+        if self.todo_timer_running:
+            self.update_todo_timer()
+        
+        # Completing a timer may have started the next one (and its tick)
+        if self.break_timer_running or self.todo_timer_running:
+            self.schedule_timer_tick()
+
     def break_timer_complete(self):
         """Handle break timer completion"""
         self.break_timer_running = False
@@ -532,22 +751,29 @@ class TaskOptimizerGUI(ctk.CTk):
 
     def update_timer_display(self):
         """Update the timer display based on active timer"""
-        if hasattr(self, 'timer_label'):
+        if self.timer_label is not None:
             if self.break_timer_running:
                 # Show break timer
                 time_str = self.format_time(self.break_time_remaining)
-                self.timer_label.configure(text=time_str, text_color="#e67e22")
+                self.set_label(self.timer_label, text=time_str, text_color="#e67e22")
             elif self.todo_timer_running:
                 # Show todo timer
                 time_str = self.format_time(self.todo_time_remaining)
-                self.timer_label.configure(text=time_str, text_color="#1abc9c")
+                self.set_label(self.timer_label, text=time_str, text_color="#1abc9c")
             else:
                 # No active timer
-                self.timer_label.configure(text="00:00:00", text_color="gray")
+                self.set_label(self.timer_label, text="00:00:00", text_color="gray")
+
+    def set_label(self, label, **options):
+        """Configure a label, leaving out options it already has"""
+        # Every configure redraws the label, even when nothing changes
+        changed = {key: value for key, value in options.items() if label.cget(key) != value}
+        if changed:
+            label.configure(**changed)
 
     def update_paused_state(self):
         """Update UI to show todo task is paused"""
-        if self.interrupted_task and hasattr(self, 'active_task_name') and hasattr(self, 'active_task_details'):
+        if self.interrupted_task and self.active_task_name is not None and self.active_task_details is not None:
             elapsed_str = self.format_time(self.task_elapsed_before_pause)
             total_str = self.format_time(self.todo_total_duration)
             self.active_task_name.configure(text=f"⏸️ PAUSED: {self.interrupted_task.name}")
@@ -555,6 +781,8 @@ class TaskOptimizerGUI(ctk.CTk):
 
     def format_time(self, seconds):
         """Format seconds to HH:MM:SS"""
+        if 0 <= seconds < 3600:
+            return UNDER_HOUR_TIMES[int(seconds)]
         hours = int(seconds // 3600)
         minutes = int((seconds % 3600) // 60)
         secs = int(seconds % 60)
@@ -574,22 +802,21 @@ class TaskOptimizerGUI(ctk.CTk):
             remaining_time = self.todo_time_remaining
             
             # RESUME todo timer loop
-            self.todo_timer_running = True
-            self.update_todo_timer()
+            self.resume_todo_timer()
             
             # Restart camera for emotion detection
             self.start_camera()
             
             # Update UI
-            if hasattr(self, 'active_task_name'):
+            if self.active_task_name is not None:
                 self.active_task_name.configure(text=f"Current Task: {self.active_task.name}")
-            if hasattr(self, 'active_task_details'):
+            if self.active_task_details is not None:
                 # Calculate elapsed for display
                 elapsed = self.todo_total_duration - self.todo_time_remaining
                 elapsed_str = self.format_time(elapsed)
                 total_str = self.format_time(self.todo_total_duration)
                 self.active_task_details.configure(text=f"Duration: {self.active_task.duration}m | Elapsed: {elapsed_str}/{total_str}")
-            if hasattr(self, 'session_emotion_label'):
+            if self.session_emotion_label is not None:
                 self.session_emotion_label.configure(text="Feeling: WORKING", text_color="#1abc9c")
             
             # Update timer display immediately
@@ -607,7 +834,7 @@ class TaskOptimizerGUI(ctk.CTk):
             self.start_camera()
             
             # Reset timer display
-            if hasattr(self, 'timer_label'):
+            if self.timer_label is not None:
                 self.timer_label.configure(text="00:00:00", text_color="gray")
             
             messagebox.showinfo("Break Ended", "Break completed! Select a new task to continue.")
@@ -616,42 +843,92 @@ class TaskOptimizerGUI(ctk.CTk):
         """Get recommendations using the selected algorithm"""
         algo_choice = self.algorithm_choice.get()
         emotion = self.current_emotion or "neutral"
+        now = datetime.now()
+        unified_pool = self.get_unified_pool()
+        
+        # Every search but the stochastic one gives the same answer for the
+        # same mood pool, emotion, resources and hour, so those are cached
+        cache_key = None
+        if not include_must_do and unified_pool and algo_choice != 4:
+            cache_key = (algo_choice, emotion, self.unified_pool_key,
+                         tuple(self.available_resources), now.hour, now.toordinal())
+        
+        cached = self.rec_cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            self.rec_cache.move_to_end(cache_key)
+            recommendations = list(cached[1])
+            if algo_choice == 1:
+                # Other A* results may have renumbered these tasks
+                for i, task in enumerate(recommendations):
+                    task.sequence_pos = i + 1
+        else:
+            # The conditions are only needed when a search actually runs
+            conditions = {
+                "current_time": now,
+                "available_resources": self.available_resources,
+                "current_energy": 5,
+                "current_emotion": emotion
+            }
+            recommendations = self.run_recommendation_algorithm(
+                algo_choice, emotion, conditions, unified_pool, include_must_do)
+            if cache_key:
+                self.rec_cache[cache_key] = (unified_pool, list(recommendations))
+                if len(self.rec_cache) > self.rec_cache_size:
+                    self.rec_cache.popitem(last=False)
         
-        conditions = {
-            "current_time": datetime.now(),
-            "available_resources": self.available_resources,
-            "current_energy": 5,
-            "current_emotion": emotion
-        }
-        
-        # Get active mood activities (default tasks)
-        active_moods = []
-        if hasattr(self, 'mood_vars'):
+        # Tag recommendations with algorithm type for UI display
+        algo_names = {1: "A*", 2: "Greedy", 3: "CSP", 4: "Stochastic", 5: "Hill Climb"}
+        curr_algo_name = algo_names.get(algo_choice, "AI")
+        for task in recommendations:
+            task.recommended_by = curr_algo_name
+            
+        return recommendations
+
+    def get_unified_pool(self):
+        """Return the checked mood activities and the preferences, rebuilt only after changes"""
+        if self.unified_pool is None:
+            # Get active mood activities (default tasks)
+            active_moods = []
             active_moods = [task for var, task in self.mood_vars if var.get()]
             for t in active_moods:
                 t.is_preference = False # Reset flag for default tasks
-        
-        # Set preference flag ONLY for manual CSP preferences
-        for t in self.csp_preferences:
-            t.is_preference = True
-        
-        unified_pool = active_moods + self.csp_preferences
-        
+            
+            # Set preference flag ONLY for manual CSP preferences
+            for t in self.csp_preferences:
+                t.is_preference = True
+            
+            self.unified_pool = active_moods + self.csp_preferences
+            self.unified_pool_key = tuple(id(t) for t in self.unified_pool)
+            self.pool_by_emotion = build_emotion_index(self.unified_pool)
+        return self.unified_pool
+
+    def invalidate_pool(self):
+        """Rebuild the recommendation pool on next use"""
+        self.unified_pool = None
+
+    def run_recommendation_algorithm(self, algo_choice, emotion, conditions, unified_pool,
+                                     include_must_do):
+        """Run the selected algorithm over the mood pool or the to-do list"""
         recommendations = []
         
+        # CSP, Greedy and Stochastic drop tasks that do not fit the emotion
+        # anyway, so they only get the ones that do
+        matching_pool = self.pool_by_emotion.get(emotion, [])
+        
         # CSP Algorithm
         if algo_choice == 3:
             # Mood tasks only (no must-do tasks in recommendations panel)
             if not include_must_do and unified_pool:
                 try:
-                    pref_recs, _ = csp_preferences(unified_pool, conditions)
-                    recommendations.extend(pref_recs[:5])
+                    pref_recs, _ = csp_preferences(matching_pool, conditions, limit=5,
+                                                   collect_reasons=False)
+                    recommendations.extend(pref_recs)
                 except:
                     pass
             
             # Must-do tasks for active session
             elif include_must_do and self.todo_tasks:
-                undone = [t for t in self.todo_tasks if t not in self.completed_tasks]
+                undone = self.get_undone_tasks()
                 try:
                     rec, warning, urgency = csp_task(undone, conditions["current_time"])
                     if rec:
@@ -676,14 +953,14 @@ class TaskOptimizerGUI(ctk.CTk):
                         print(f"A* Error: {e}")
                 elif algo_choice == 2:  # Greedy
                     try:
-                        best = greedy(unified_pool, emotion, conditions)
+                        best = greedy(matching_pool, emotion, conditions)
                         if best:
                             recommendations.append(best)
                     except Exception as e:
                         print(f"Greedy Error: {e}")
                 elif algo_choice == 4:  # Stochastic
                     try:
-                        best = stochastic(unified_pool, emotion, conditions)
+                        best = stochastic(matching_pool, emotion, conditions)
                         if best:
                             recommendations.append(best)
                     except Exception as e:
@@ -698,22 +975,17 @@ class TaskOptimizerGUI(ctk.CTk):
             
             # Must-do tasks
             elif include_must_do and self.todo_tasks:
-                undone = [t for t in self.todo_tasks if t not in self.completed_tasks]
+                undone = self.get_undone_tasks()
                 for task in undone:
                     try:
                         task.compute_score(emotion, conditions["current_time"])
                     except:
-                        pass
-                undone.sort(key=lambda t: getattr(t, 'score', 0), reverse=True)
+                        task.score = 0  # Not a stale score from an earlier call
+                
+                # Only the best task is used, so take the max rather than sort
                 if undone:
-                    recommendations.append(undone[0])
+                    recommendations.append(max(undone, key=lambda t: t.score))
         
-        # Tag recommendations with algorithm type for UI display
-        algo_names = {1: "A*", 2: "Greedy", 3: "CSP", 4: "Stochastic", 5: "Hill Climb"}
-        curr_algo_name = algo_names.get(algo_choice, "AI")
-        for task in recommendations:
-            task.recommended_by = curr_algo_name
-            
         return recommendations
 
     def toggle_camera(self):
@@ -725,66 +997,149 @@ class TaskOptimizerGUI(ctk.CTk):
 
     def start_camera(self):
         """Start the camera feed"""
+        import cv2  # Loaded with the camera, not at startup
         if self.cap is None:
-            self.cap = cv2.VideoCapture(0)
+            # DirectShow opens much faster than Windows' default Media
+            # Foundation backend; elsewhere OpenCV's default is used
+            backend = cv2.CAP_DSHOW if sys.platform == "win32" else cv2.CAP_ANY
+            self.cap = cv2.VideoCapture(0, backend)
+            
+            # Capture at the preview size and rate as MJPG, so frames need no
+            # resize, and keep the backend from queueing frames behind the
+            # newest one (backends ignore settings they do not support)
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+            self.cap.set(cv2.CAP_PROP_FPS, 15)
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
         
         if not self.cap.isOpened():
             messagebox.showerror("Error", "Could not open camera")
             return
         
-        self.camera_running = True
-        if hasattr(self, 'camera_btn'):
+        with self.frame_lock:
+            self.camera_running = True
+            # A paused thread still in a read simply carries on, so only one
+            # thread ever reads from the camera
+            if self.capture_thread is None:
+                self.capture_thread = threading.Thread(target=self.capture_loop, args=(self.cap,), daemon=True)
+                self.capture_thread.start()
+        if self.camera_btn is not None:
             self.camera_btn.configure(text="⏹️ Stop Camera")
-        self.update_camera()
+        
+        # A preview chain that is already pending (the camera was running, or
+        # stopped less than one interval ago) just carries on
+        if self.camera_tick is None:
+            self.update_camera()
 
     def update_camera(self):
         """Update camera frame - simplified, emotion detection handled in monitor thread"""
-        if self.camera_running and self.cap:
-            ret, frame = self.cap.read()
-            if ret:
-                # Convert frame for display
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                frame = cv2.resize(frame, (640, 480))
-                
-                # Add current emotion text
-                cv2.putText(frame, f"Emotion: {self.current_emotion}", (10, 30), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-                
-                # Convert to ImageTk
-                img = Image.fromarray(frame)
-                imgtk = ImageTk.PhotoImage(image=img)
-                
-                # Update labels
-                if hasattr(self, 'camera_label'):
-                    self.camera_label.configure(image=imgtk, text="")
-                    self.camera_label.image = imgtk
-                
-                if hasattr(self, 'session_camera_label'):
-                    self.session_camera_label.configure(image=imgtk, text="")
-                    self.session_camera_label.image = imgtk
-                
-                # Schedule next update
-                self.after(10, self.update_camera)
+        self.camera_tick = None
+        if not self.camera_running:
+            # Stopped or paused for a break; a paused camera stays open
+            self.show_camera_stopped()
+            return
+        if not self.cap:
+            self.stop_camera()
+            return
+        
+        with self.frame_lock:
+            preview = self.latest_preview
+            frame_time = self.latest_frame_time
+        
+        if preview is None or frame_time == self.shown_frame_time or self.preview_pending:
+            # No new frame yet (or Tk is still busy drawing the last one),
+            # unless the capture thread has stopped
+            if self.capture_thread is not None and self.capture_thread.is_alive():
+                self.camera_tick = self.after(self.camera_interval_ms, self.update_camera)
             else:
                 self.stop_camera()
+            return
+        self.shown_frame_time = frame_time
+        
+        # Paint the capture thread's preview into the shared ImageTk; the
+        # labels showing it redraw on their own
+        if self.camera_photo is None:
+            self.camera_photo = ImageTk.PhotoImage(image=preview)
         else:
-            self.stop_camera()
+            self.camera_photo.paste(preview)
+        
+        # Update labels (the emotion text is a label laid over each one,
+        # rather than drawn into every frame)
+        if not self.camera_photo_shown:
+            self.camera_photo_shown = True
+            for overlay in self.emotion_overlays:
+                overlay.place(x=10, y=10)
+            if self.camera_label is not None:
+                self.camera_label.configure(image=self.camera_photo, text="")
+                self.camera_label.image = self.camera_photo
+            
+            if self.session_camera_label is not None:
+                self.session_camera_label.configure(image=self.camera_photo, text="")
+                self.session_camera_label.image = self.camera_photo
+        
+        # Tk runs idle callbacks after its pending redraws, so this clears
+        # once the frame is on screen
+        self.preview_pending = True
+        self.after_idle(self.clear_preview_pending)
+        
+        # Schedule next update
+        self.camera_tick = self.after(self.camera_interval_ms, self.update_camera)
+
+    def clear_preview_pending(self):
+        """Allow the next preview frame once Tk has drawn the last one"""
+        self.preview_pending = False
+
+    def pause_camera(self):
+        """Stop capturing but keep the camera open; start_camera resumes it"""
+        with self.frame_lock:
+            self.camera_running = False
+            thread = self.capture_thread
+        if thread is not None:
+            # The thread clears capture_thread itself once it stops; a read
+            # that takes longer is not waited for
+            thread.join(timeout=1)
+        with self.frame_lock:
+            self.latest_frame = None
+            self.latest_preview = None
+
+    def release_camera(self):
+        """Stop the capture thread, then release the camera"""
+        self.pause_camera()
+        with self.frame_lock:
+            cap, self.cap = self.cap, None
+            # Never release mid-read: a thread still in a read releases the
+            # camera itself when the read returns
+            release = self.capture_thread is None
+            self.capture_thread = None
+        if cap and release:
+            cap.release()
 
     def stop_camera(self):
         """Stop the camera feed"""
-        self.camera_running = False
-        
-        if self.cap:
-            self.cap.release()
-            self.cap = None
-        
-        if hasattr(self, 'camera_btn'):
+        self.release_camera()
+        self.show_camera_stopped()
+
+    def create_emotion_overlay(self, camera_label):
+        """Create the emotion label shown over a camera preview"""
+        overlay = ctk.CTkLabel(camera_label, textvariable=self.overlay_emotion,
+                               text_color="#00ff00", fg_color="transparent",
+                               font=self.get_font(size=20, weight="bold"))
+        self.emotion_overlays.append(overlay)
+        return overlay
+
+    def show_camera_stopped(self):
+        """Show the stopped state in the camera widgets"""
+        if self.camera_btn is not None:
             self.camera_btn.configure(text="▶️ Start Camera")
         
-        if hasattr(self, 'camera_label'):
+        if self.camera_label is not None:
             self.camera_label.configure(image="", text="Camera stopped")
+        for overlay in self.emotion_overlays:
+            overlay.place_forget()
+        self.camera_photo_shown = False
         
-        if hasattr(self, 'emotion_label'):
+        if self.emotion_label is not None:
             self.emotion_label.configure(text="Emotion: --")
 
     def start_gui_session(self):
@@ -796,34 +1151,23 @@ class TaskOptimizerGUI(ctk.CTk):
         self.is_session_active = True
         self.session_start_time = time.time()
         self.completed_tasks = []
+        self.completed_ids.clear()
         
         # Get resources from entry if it exists
-        if hasattr(self, 'resources_entry'):
+        if self.resources_entry is not None:
             res_text = self.resources_entry.get()
             if res_text:
                 self.available_resources = [r.strip() for r in res_text.split(',')]
         
         # Pick first task
-        undone = [t for t in self.todo_tasks if t not in self.completed_tasks]
+        undone = self.get_undone_tasks()
         if not undone:
             messagebox.showinfo("Info", "All tasks already completed!")
             self.stop_gui_session()
             return
         
-        # Sort by deadline if exists, otherwise by priority
-        for task in undone:
-            if hasattr(task, 'deadline') and task.deadline:
-                try:
-                    datetime.strptime(task.deadline, "%Y-%m-%d")
-                except:
-                    task.deadline = None
-        
-        undone.sort(key=lambda t: (
-            t.deadline if hasattr(t, 'deadline') and t.deadline else "9999-12-31",
-            -getattr(t, 'base_priority', 0)
-        ))
-        
-        self.active_task = undone[0]
+        # Pick by deadline if exists, otherwise by priority
+        self.active_task = self.pick_next_task(undone)
         self.task_start_time = time.time()
         
         # START the todo timer
@@ -831,13 +1175,13 @@ class TaskOptimizerGUI(ctk.CTk):
         
         # Update UI
         self.tabview.set("Active Session")
-        if hasattr(self, 'session_title'):
+        if self.session_title is not None:
             self.session_title.configure(text="🚀 Session Active")
-        if hasattr(self, 'active_task_name'):
+        if self.active_task_name is not None:
             self.active_task_name.configure(text=f"Current Task: {self.active_task.name}")
-        if hasattr(self, 'active_task_details'):
+        if self.active_task_details is not None:
             self.active_task_details.configure(text=f"Duration: {self.active_task.duration}m | Priority: {getattr(self.active_task, 'base_priority', 0)}")
-        if hasattr(self, 'sidebar_status'):
+        if self.sidebar_status is not None:
             self.sidebar_status.configure(text="Status: SESSION ACTIVE", text_color="#1abc9c")
         
         # Update timer display
@@ -846,12 +1190,25 @@ class TaskOptimizerGUI(ctk.CTk):
         # Start camera for emotion detection
         self.start_camera()
         
-        # Start session loop
-        self.run_session_loop()
-        
         # Update recommendations panel
         self.update_recommendations_panel()
 
+    def mark_task_completed(self, task):
+        """Record a task as completed in this session"""
+        self.completed_tasks.append(task)
+        self.completed_ids.add(id(task))
+
+    def get_undone_tasks(self):
+        """Return the must-do tasks not completed in this session"""
+        return [t for t in self.todo_tasks if id(t) not in self.completed_ids]
+
+    def pick_next_task(self, undone):
+        """Return the undone task with the earliest deadline, then the highest priority"""
+        # Only the first task in that order is needed, so one pass replaces
+        # the full sort; the key caches each parsed deadline on the task, and
+        # a deadline that does not parse counts as none
+        return min(undone, key=Task.get_todo_sort_key)
+
     def complete_current_task(self):
         """Mark task as done and pick next"""
         if not self.active_task:
@@ -864,38 +1221,26 @@ class TaskOptimizerGUI(ctk.CTk):
             return
         
         # It's a must-do task, mark as completed
-        self.completed_tasks.append(self.active_task)
+        self.mark_task_completed(self.active_task)
         
         # Pick next must-do
-        undone = [t for t in self.todo_tasks if t not in self.completed_tasks]
+        undone = self.get_undone_tasks()
         if not undone:
             messagebox.showinfo("Session Over", "All tasks completed! Amazing work.")
             self.stop_gui_session()
             return
         
-        # Sort by deadline if exists, otherwise by priority
-        for task in undone:
-            if hasattr(task, 'deadline') and task.deadline:
-                try:
-                    datetime.strptime(task.deadline, "%Y-%m-%d")
-                except:
-                    task.deadline = None
-        
-        undone.sort(key=lambda t: (
-            t.deadline if hasattr(t, 'deadline') and t.deadline else "9999-12-31",
-            -getattr(t, 'base_priority', 0)
-        ))
-        
-        self.active_task = undone[0]
+        # Pick by deadline if exists, otherwise by priority
+        self.active_task = self.pick_next_task(undone)
         self.task_start_time = time.time()
         
         # START new todo timer for the new task
         self.start_todo_timer(self.active_task.duration)
         
         # Update UI
-        if hasattr(self, 'active_task_name'):
+        if self.active_task_name is not None:
             self.active_task_name.configure(text=f"Current Task: {self.active_task.name}")
-        if hasattr(self, 'active_task_details'):
+        if self.active_task_details is not None:
             self.active_task_details.configure(text=f"Duration: {self.active_task.duration}m | Priority: {getattr(self.active_task, 'base_priority', 0)}")
         
         # Update timer display
@@ -910,7 +1255,7 @@ class TaskOptimizerGUI(ctk.CTk):
         
         # Title
         title = ctk.CTkLabel(tab, text="📊 Dashboard Overview", 
-                            font=ctk.CTkFont(size=24, weight="bold"))
+                            font=self.get_font(size=24, weight="bold"))
         title.grid(row=0, column=0, columnspan=3, padx=20, pady=(20, 30))
         
         # Stats frame
@@ -932,9 +1277,9 @@ class TaskOptimizerGUI(ctk.CTk):
             frame.grid(row=0, column=i, padx=10, pady=10, sticky="nsew")
             frame.grid_propagate(False)
             
-            ctk.CTkLabel(frame, text=icon, font=ctk.CTkFont(size=24)).pack(pady=(15, 5))
-            ctk.CTkLabel(frame, text=title_text, font=ctk.CTkFont(size=14, weight="bold")).pack()
-            value_label = ctk.CTkLabel(frame, text=value, font=ctk.CTkFont(size=28, weight="bold"))
+            ctk.CTkLabel(frame, text=icon, font=self.get_font(size=24)).pack(pady=(15, 5))
+            ctk.CTkLabel(frame, text=title_text, font=self.get_font(size=14, weight="bold")).pack()
+            value_label = ctk.CTkLabel(frame, text=value, font=self.get_font(size=28, weight="bold"))
             value_label.pack(pady=(5, 15))
             
             self.stats_widgets[title_text] = value_label
@@ -944,10 +1289,10 @@ class TaskOptimizerGUI(ctk.CTk):
         algo_frame.grid(row=2, column=0, columnspan=3, padx=20, pady=20, sticky="ew")
         
         ctk.CTkLabel(algo_frame, text="🎯 Active Algorithm:", 
-                    font=ctk.CTkFont(size=16, weight="bold")).pack(side="left", padx=20, pady=20)
+                    font=self.get_font(size=16, weight="bold")).pack(side="left", padx=20, pady=20)
         
         self.algo_label = ctk.CTkLabel(algo_frame, text="CSP (Constraint Satisfaction)", 
-                                      font=ctk.CTkFont(size=16))
+                                      font=self.get_font(size=16))
         self.algo_label.pack(side="left", padx=10, pady=20)
         
         # Quick actions
@@ -966,7 +1311,7 @@ class TaskOptimizerGUI(ctk.CTk):
         
         # Title
         title = ctk.CTkLabel(tab, text="📋 Must-Do Tasks Management", 
-                            font=ctk.CTkFont(size=20, weight="bold"))
+                            font=self.get_font(size=20, weight="bold"))
         title.grid(row=0, column=0, padx=20, pady=(20, 10), sticky="w")
         
         # Input Frame
@@ -1010,12 +1355,11 @@ class TaskOptimizerGUI(ctk.CTk):
         row += 1
         ctk.CTkLabel(input_frame, text="Best Emotions:").grid(row=row, column=0, padx=10, pady=5, sticky="w")
         
-        emotions = ["sad", "happy", "neutral", "fear", "surprise", "disgust", "angry"]
         self.emotion_vars = {}
         emotion_frame = ctk.CTkFrame(input_frame)
         emotion_frame.grid(row=row, column=1, padx=10, pady=5, sticky="w")
         
-        for i, emotion in enumerate(emotions):
+        for i, emotion in enumerate(EMOTIONS):
             var = tk.BooleanVar(value=(emotion in ["neutral"]))
             cb = ctk.CTkCheckBox(emotion_frame, text=emotion.capitalize(), variable=var)
             cb.grid(row=0, column=i, padx=5)
@@ -1037,7 +1381,7 @@ class TaskOptimizerGUI(ctk.CTk):
         list_frame.grid_columnconfigure(0, weight=1)
         
         ctk.CTkLabel(list_frame, text="Current Must-Do Tasks:", 
-                    font=ctk.CTkFont(size=16, weight="bold")).grid(row=0, column=0, padx=10, pady=10, sticky="w")
+                    font=self.get_font(size=16, weight="bold")).grid(row=0, column=0, padx=10, pady=10, sticky="w")
         
         self.task_list_scroll = ctk.CTkScrollableFrame(list_frame, height=300)
         self.task_list_scroll.grid(row=1, column=0, padx=10, pady=10, sticky="nsew")
@@ -1097,45 +1441,79 @@ class TaskOptimizerGUI(ctk.CTk):
 
     def refresh_task_list(self):
         """Refresh the task list display"""
-        if not hasattr(self, 'task_list_container'):
+        if self.task_list_container is None:
             return
-            
-        for widget in self.task_list_container.winfo_children():
-            widget.destroy()
         
-        if not self.todo_tasks:
-            label = ctk.CTkLabel(self.task_list_container, text="No tasks added yet", 
-                                text_color="gray", font=ctk.CTkFont(size=14))
+        self.sync_list_rows(self.task_list_container, self.task_rows, self.todo_tasks,
+                            self.create_task_row, "No tasks added yet")
+
+    def create_task_row(self, container, task):
+        """Build the (unpacked) list row for a must-do task"""
+        frame = ctk.CTkFrame(container)
+        frame.grid_columnconfigure(0, weight=1)
+        
+        # Task info
+        info_frame = ctk.CTkFrame(frame, fg_color="transparent")
+        info_frame.grid(row=0, column=0, sticky="w", padx=10, pady=5)
+        
+        ctk.CTkLabel(info_frame, text=f"📝 {task.name}", 
+                    font=self.get_font(size=14, weight="bold")).pack(anchor="w")
+        
+        details = f"Duration: {task.duration}min | Priority: {task.base_priority}"
+        if hasattr(task, 'deadline') and task.deadline:
+            details += f" | Deadline: {task.deadline}"
+        ctk.CTkLabel(info_frame, text=details, text_color="gray").pack(anchor="w")
+        
+        # Emotions
+        if hasattr(task, 'emotion_fit') and task.emotion_fit:
+            emotions = ", ".join(task.emotion_fit)
+            ctk.CTkLabel(info_frame, text=f"Emotions: {emotions}", 
+                        text_color="lightblue").pack(anchor="w")
+        
+        # Remove button
+        ctk.CTkButton(frame, text="🗑️", width=40, height=30, fg_color="transparent", 
+                     text_color="red", hover_color="#3a3a3a",
+                     command=lambda t=task: self.remove_task(t)).grid(row=0, column=1, padx=10)
+        return frame
+
+    def sync_list_rows(self, container, rows, items, create_row, empty_text):
+        """Show one row per item in container, building rows only for new items"""
+        # Rows are keyed by item id and keep their item, so an id reused by
+        # a new object is never mistaken for the old one
+        current = {id(item): item for item in items}
+        for key in [key for key, (item, _) in rows.items() if current.get(key) is not item]:
+            rows.pop(key)[1].destroy()
+        
+        # Anything else in the container is the "nothing added" label
+        row_frames = {frame for _, frame in rows.values()}
+        for widget in container.winfo_children():
+            if widget not in row_frames:
+                widget.destroy()
+        
+        if not items:
+            label = ctk.CTkLabel(container, text=empty_text, 
+                                text_color="gray", font=self.get_font(size=14))
             label.pack(pady=20)
             return
         
-        for i, task in enumerate(self.todo_tasks):
-            frame = ctk.CTkFrame(self.task_list_container)
-            frame.pack(fill="x", padx=5, pady=5, expand=True)
-            frame.grid_columnconfigure(0, weight=1)
-            
-            # Task info
-            info_frame = ctk.CTkFrame(frame, fg_color="transparent")
-            info_frame.grid(row=0, column=0, sticky="w", padx=10, pady=5)
-            
-            ctk.CTkLabel(info_frame, text=f"📝 {task.name}", 
-                        font=ctk.CTkFont(size=14, weight="bold")).pack(anchor="w")
-            
-            details = f"Duration: {task.duration}min | Priority: {task.base_priority}"
-            if hasattr(task, 'deadline') and task.deadline:
-                details += f" | Deadline: {task.deadline}"
-            ctk.CTkLabel(info_frame, text=details, text_color="gray").pack(anchor="w")
-            
-            # Emotions
-            if hasattr(task, 'emotion_fit') and task.emotion_fit:
-                emotions = ", ".join(task.emotion_fit)
-                ctk.CTkLabel(info_frame, text=f"Emotions: {emotions}", 
-                            text_color="lightblue").pack(anchor="w")
-            
-            # Remove button
-            ctk.CTkButton(frame, text="🗑️", width=40, height=30, fg_color="transparent", 
-                         text_color="red", hover_color="#3a3a3a",
-                         command=lambda t=task: self.remove_task(t)).grid(row=0, column=1, padx=10)
+        new_frames = []
+        for item in items:
+            if id(item) not in rows:
+                rows[id(item)] = (item, create_row(container, item))
+                new_frames.append(rows[id(item)][1])
+        
+        # New rows go after the kept ones, which is the list order unless
+        # items were inserted or moved; then every row is repacked in order
+        order = [id(item) for item in items]
+        if list(rows) == order:
+            for frame in new_frames:
+                frame.pack(fill="x", padx=5, pady=5, expand=True)
+        else:
+            for key in order:
+                rows[key] = rows.pop(key)
+                frame = rows[key][1]
+                frame.pack_forget()
+                frame.pack(fill="x", padx=5, pady=5, expand=True)
 
     def remove_task(self, task):
         """Remove a task from the list"""
@@ -1149,7 +1527,7 @@ class TaskOptimizerGUI(ctk.CTk):
         tab.grid_columnconfigure(0, weight=1)
         
         title = ctk.CTkLabel(tab, text="😊 Mood-Changing Activities", 
-                            font=ctk.CTkFont(size=20, weight="bold"))
+                            font=self.get_font(size=20, weight="bold"))
         title.grid(row=0, column=0, padx=20, pady=(20, 10), sticky="w")
         
         # Default activities
@@ -1157,7 +1535,7 @@ class TaskOptimizerGUI(ctk.CTk):
         default_frame.grid(row=1, column=0, padx=20, pady=10, sticky="ew")
         
         ctk.CTkLabel(default_frame, text="Select Default Activities:", 
-                    font=ctk.CTkFont(size=16)).pack(anchor="w", padx=10, pady=10)
+                    font=self.get_font(size=16)).pack(anchor="w", padx=10, pady=10)
         
         self.mood_scroll = ctk.CTkScrollableFrame(default_frame, height=200)
         self.mood_scroll.pack(fill="both", expand=True, padx=10, pady=10)
@@ -1168,6 +1546,7 @@ class TaskOptimizerGUI(ctk.CTk):
         
         for task in default_tasks:
             var = tk.BooleanVar(value=True)
+            var.trace_add("write", lambda *args: self.invalidate_pool())
             frame = ctk.CTkFrame(self.mood_scroll)
             frame.pack(fill="x", padx=5, pady=2)
             
@@ -1175,14 +1554,15 @@ class TaskOptimizerGUI(ctk.CTk):
             cb.pack(side="left", padx=5)
             
             ctk.CTkLabel(frame, text=f"{task.name} ({task.duration}min)", 
-                        font=ctk.CTkFont(size=12)).pack(side="left", padx=5)
+                        font=self.get_font(size=12)).pack(side="left", padx=5)
             
             if hasattr(task, 'emotion_fit') and task.emotion_fit:
                 emotions = ", ".join(task.emotion_fit[:2])
                 ctk.CTkLabel(frame, text=f"Helps: {emotions}", 
-                            text_color="gray", font=ctk.CTkFont(size=10)).pack(side="left", padx=10)
+                            text_color="gray", font=self.get_font(size=10)).pack(side="left", padx=10)
             
             self.mood_vars.append((var, task))
+        self.invalidate_pool()
         
         # Add all button
         ctk.CTkButton(default_frame, text="✅ Select All Default Activities", 
@@ -1200,7 +1580,7 @@ class TaskOptimizerGUI(ctk.CTk):
         tab.grid_columnconfigure(0, weight=1)
         
         title = ctk.CTkLabel(tab, text="⚙️ CSP Preferences & Constraints", 
-                            font=ctk.CTkFont(size=20, weight="bold"))
+                            font=self.get_font(size=20, weight="bold"))
         title.grid(row=0, column=0, padx=20, pady=(20, 10), sticky="w")
         
         # Input Frame
@@ -1243,12 +1623,11 @@ class TaskOptimizerGUI(ctk.CTk):
         row += 1
         ctk.CTkLabel(input_frame, text="Helps When Feeling:").grid(row=row, column=0, padx=10, pady=5, sticky="w")
         
-        emotions = ["sad", "happy", "neutral", "fear", "surprise", "disgust", "angry"]
         self.pref_emotion_vars = {}
         emotion_frame = ctk.CTkFrame(input_frame)
         emotion_frame.grid(row=row, column=1, padx=10, pady=5, sticky="w")
         
-        for i, emotion in enumerate(emotions):
+        for i, emotion in enumerate(EMOTIONS):
             var = tk.BooleanVar(value=(emotion in ["sad", "angry", "fear"]))
             cb = ctk.CTkCheckBox(emotion_frame, text=emotion.capitalize(), variable=var)
             cb.grid(row=0, column=i, padx=5)
@@ -1266,7 +1645,7 @@ class TaskOptimizerGUI(ctk.CTk):
         tab.grid_rowconfigure(2, weight=1)
         
         ctk.CTkLabel(list_frame, text="Current Preferences:", 
-                    font=ctk.CTkFont(size=16, weight="bold")).grid(row=0, column=0, padx=10, pady=10, sticky="w")
+                    font=self.get_font(size=16, weight="bold")).grid(row=0, column=0, padx=10, pady=10, sticky="w")
         
         self.pref_list_scroll = ctk.CTkScrollableFrame(list_frame, height=250)
         self.pref_list_scroll.grid(row=1, column=0, padx=10, pady=10, sticky="nsew")
@@ -1317,6 +1696,7 @@ class TaskOptimizerGUI(ctk.CTk):
             pref_task.is_preference = True
             
             self.csp_preferences.append(pref_task)
+            self.invalidate_pool()
             self.refresh_pref_list()
             self.pref_name_entry.delete(0, tk.END)
             self.update_stats()
@@ -1328,56 +1708,53 @@ class TaskOptimizerGUI(ctk.CTk):
 
     def refresh_pref_list(self):
         """Refresh the preferences list"""
-        if not hasattr(self, 'pref_list_container'):
+        if self.pref_list_container is None:
             return
-            
-        for widget in self.pref_list_container.winfo_children():
-            widget.destroy()
         
-        if not self.csp_preferences:
-            label = ctk.CTkLabel(self.pref_list_container, text="No preferences added yet", 
-                                text_color="gray", font=ctk.CTkFont(size=14))
-            label.pack(pady=20)
-            return
+        self.sync_list_rows(self.pref_list_container, self.pref_rows, self.csp_preferences,
+                            self.create_pref_row, "No preferences added yet")
+
+    def create_pref_row(self, container, pref):
+        """Build the (unpacked) list row for a preference"""
+        frame = ctk.CTkFrame(container)
+        frame.grid_columnconfigure(0, weight=1)
         
-        for pref in self.csp_preferences:
-            frame = ctk.CTkFrame(self.pref_list_container)
-            frame.pack(fill="x", padx=5, pady=5, expand=True)
-            frame.grid_columnconfigure(0, weight=1)
-            
-            # Preference info
-            info_frame = ctk.CTkFrame(frame, fg_color="transparent")
-            info_frame.grid(row=0, column=0, sticky="w", padx=10, pady=5)
-            
-            ctk.CTkLabel(info_frame, text=f"🎯 {pref.name}", 
-                        font=ctk.CTkFont(size=14, weight="bold")).pack(anchor="w")
-            
-            # Show emotions
-            if hasattr(pref, 'emotion_fit') and pref.emotion_fit:
-                emotions_str = ", ".join(pref.emotion_fit)
-                ctk.CTkLabel(info_frame, text=f"Helps when feeling: {emotions_str}", 
-                           text_color="yellow").pack(anchor="w")
-            
-            # Show constraints
-            if hasattr(pref, 'constraints') and pref.constraints:
-                constraints = pref.constraints
-                if "allowed_time" in constraints:
-                    time_info = constraints["allowed_time"]
-                    time_str = f"Time: {time_info.get('start', '?')}:00-{time_info.get('end', '?')}:00"
-                    ctk.CTkLabel(info_frame, text=time_str, text_color="lightblue").pack(anchor="w")
-                
-                if "requires" in constraints and constraints["requires"]:
-                    resources = ", ".join(constraints["requires"]) if isinstance(constraints["requires"], list) else constraints["requires"]
-                    ctk.CTkLabel(info_frame, text=f"Resources: {resources}", text_color="lightgreen").pack(anchor="w")
+        # Preference info
+        info_frame = ctk.CTkFrame(frame, fg_color="transparent")
+        info_frame.grid(row=0, column=0, sticky="w", padx=10, pady=5)
+        
+        ctk.CTkLabel(info_frame, text=f"🎯 {pref.name}", 
+                    font=self.get_font(size=14, weight="bold")).pack(anchor="w")
+        
+        # Show emotions
+        if hasattr(pref, 'emotion_fit') and pref.emotion_fit:
+            emotions_str = ", ".join(pref.emotion_fit)
+            ctk.CTkLabel(info_frame, text=f"Helps when feeling: {emotions_str}", 
+                       text_color="yellow").pack(anchor="w")
+        
+        # Show constraints
+        if hasattr(pref, 'constraints') and pref.constraints:
+            constraints = pref.constraints
+            if "allowed_time" in constraints:
+                time_info = constraints["allowed_time"]
+                time_str = f"Time: {time_info.get('start', '?')}:00-{time_info.get('end', '?')}:00"
+                ctk.CTkLabel(info_frame, text=time_str, text_color="lightblue").pack(anchor="w")
             
-            # Remove button
-            ctk.CTkButton(frame, text="🗑️", width=40, height=30, fg_color="transparent", 
-                         text_color="red", hover_color="#3a3a3a",
-                         command=lambda p=pref: self.remove_pref(p)).grid(row=0, column=1, padx=10)
+            if "requires" in constraints and constraints["requires"]:
+                resources = ", ".join(constraints["requires"]) if isinstance(constraints["requires"], list) else constraints["requires"]
+                ctk.CTkLabel(info_frame, text=f"Resources: {resources}", text_color="lightgreen").pack(anchor="w")
+        
+        # Remove button
+        ctk.CTkButton(frame, text="🗑️", width=40, height=30, fg_color="transparent", 
+                     text_color="red", hover_color="#3a3a3a",
+                     command=lambda p=pref: self.remove_pref(p)).grid(row=0, column=1, padx=10)
+        return frame
 
     def remove_pref(self, pref):
         """Remove a preference"""
         self.csp_preferences.remove(pref)
+        self.invalidate_pool()
+        self.rec_cache.clear()
         self.refresh_pref_list()
         self.update_stats()
 
@@ -1389,7 +1766,7 @@ class TaskOptimizerGUI(ctk.CTk):
         
         # Title
         title = ctk.CTkLabel(tab, text="📹 Live Emotion Detection", 
-                            font=ctk.CTkFont(size=20, weight="bold"))
+                            font=self.get_font(size=20, weight="bold"))
         title.grid(row=0, column=0, padx=20, pady=(20, 10), sticky="w")
         
         # Camera container
@@ -1407,7 +1784,7 @@ class TaskOptimizerGUI(ctk.CTk):
         self.camera_btn.pack(side="left", padx=10, pady=10)
         
         self.emotion_label = ctk.CTkLabel(controls_frame, text="Emotion: neutral", 
-                                         font=ctk.CTkFont(size=16, weight="bold"))
+                                         font=self.get_font(size=16, weight="bold"))
         self.emotion_label.pack(side="left", padx=20, pady=10)
         
         # Camera display
@@ -1416,6 +1793,7 @@ class TaskOptimizerGUI(ctk.CTk):
         
         self.camera_label = ctk.CTkLabel(self.camera_frame, text="Camera feed will appear here")
         self.camera_label.pack(expand=True, padx=20, pady=20)
+        self.create_emotion_overlay(self.camera_label)
         
         # Stats
         stats_frame = ctk.CTkFrame(tab)
@@ -1432,7 +1810,7 @@ class TaskOptimizerGUI(ctk.CTk):
         
         # Title
         title = ctk.CTkLabel(tab, text="🚀 Start Optimization Session", 
-                            font=ctk.CTkFont(size=24, weight="bold"))
+                            font=self.get_font(size=24, weight="bold"))
         title.grid(row=0, column=0, padx=20, pady=(30, 20), sticky="w")
         
         # Algorithm selection
@@ -1440,7 +1818,7 @@ class TaskOptimizerGUI(ctk.CTk):
         algo_frame.grid(row=1, column=0, padx=20, pady=10, sticky="ew")
         
         ctk.CTkLabel(algo_frame, text="Select Algorithm:", 
-                    font=ctk.CTkFont(size=18, weight="bold")).pack(anchor="w", padx=20, pady=(20, 10))
+                    font=self.get_font(size=18, weight="bold")).pack(anchor="w", padx=20, pady=(20, 10))
         
         # Algorithm options
         algos = [
@@ -1456,19 +1834,19 @@ class TaskOptimizerGUI(ctk.CTk):
             frame.pack(fill="x", padx=20, pady=5)
             
             rb = ctk.CTkRadioButton(frame, text=name, variable=self.algorithm_choice, 
-                                   value=value, font=ctk.CTkFont(size=14),
-                                   command=self.update_recommendations_panel)
+                                   value=value, font=self.get_font(size=14),
+                                   command=self.on_algorithm_change)
             rb.pack(side="left")
             
             ctk.CTkLabel(frame, text=desc, text_color="gray", 
-                        font=ctk.CTkFont(size=12)).pack(side="left", padx=20)
+                        font=self.get_font(size=12)).pack(side="left", padx=20)
         
         # Session settings
         settings_frame = ctk.CTkFrame(tab)
         settings_frame.grid(row=2, column=0, padx=20, pady=20, sticky="ew")
         
         ctk.CTkLabel(settings_frame, text="Session Settings:", 
-                    font=ctk.CTkFont(size=16, weight="bold")).pack(anchor="w", padx=20, pady=(20, 10))
+                    font=self.get_font(size=16, weight="bold")).pack(anchor="w", padx=20, pady=(20, 10))
         
         # Deadline warnings checkbox
         deadline_cb = ctk.CTkCheckBox(settings_frame, text="Show deadline warnings", 
@@ -1487,40 +1865,43 @@ class TaskOptimizerGUI(ctk.CTk):
         
         # Start button
         self.start_btn = ctk.CTkButton(tab, text="🚀 Launch Integrated Session", 
-                                      height=60, font=ctk.CTkFont(size=18, weight="bold"),
+                                      height=60, font=self.get_font(size=18, weight="bold"),
                                       command=self.start_gui_session)
         self.start_btn.grid(row=3, column=0, padx=20, pady=40, sticky="ew")
         
         # Status
         self.session_status = ctk.CTkLabel(tab, text="Status: Ready to start session", 
-                                          text_color="gray", font=ctk.CTkFont(size=14))
+                                          text_color="gray", font=self.get_font(size=14))
         self.session_status.grid(row=4, column=0, padx=20, pady=10)
         
         self.start_emotion_label = ctk.CTkLabel(tab, text="Current Emotion: (No Camera)", 
-                                               font=ctk.CTkFont(size=16, weight="bold"))
+                                               font=self.get_font(size=16, weight="bold"))
         self.start_emotion_label.grid(row=5, column=0, padx=20, pady=10)
 
     def update_stats(self):
         """Update statistics display"""
-        if not hasattr(self, 'stats_widgets'):
+        if self.stats_widgets is None:
             return
             
         # Update task counts
         if 'Must-Do Tasks' in self.stats_widgets:
-            self.stats_widgets['Must-Do Tasks'].configure(text=str(len(self.todo_tasks)))
+            self.set_label(self.stats_widgets['Must-Do Tasks'], text=str(len(self.todo_tasks)))
         
         if 'Mood Activities' in self.stats_widgets:
-            selected_count = sum(1 for var, _ in getattr(self, 'mood_vars', [])) if hasattr(self, 'mood_vars') else 0
-            self.stats_widgets['Mood Activities'].configure(text=str(selected_count))
+            selected_count = len(self.mood_vars)
+            self.set_label(self.stats_widgets['Mood Activities'], text=str(selected_count))
         
         if 'Preferences' in self.stats_widgets:
-            self.stats_widgets['Preferences'].configure(text=str(len(self.csp_preferences)))
+            self.set_label(self.stats_widgets['Preferences'], text=str(len(self.csp_preferences)))
         
         if 'Current Emotion' in self.stats_widgets:
-            self.stats_widgets['Current Emotion'].configure(text=self.current_emotion)
+            self.set_label(self.stats_widgets['Current Emotion'], text=self.current_emotion)
         
-        # Update algorithm label
-        if hasattr(self, 'algo_label'):
+        self.update_algo_label()
+
+    def update_algo_label(self):
+        """Show the selected algorithm on the dashboard"""
+        if self.algo_label is not None:
             algo_map = {
                 1: "Mini A*",
                 2: "Greedy", 
@@ -1528,7 +1909,12 @@ class TaskOptimizerGUI(ctk.CTk):
                 4: "Stochastic",
                 5: "Hill Climbing"
             }
-            self.algo_label.configure(text=algo_map.get(self.algorithm_choice.get(), "CSP"))
+            self.set_label(self.algo_label, text=algo_map.get(self.algorithm_choice.get(), "CSP"))
+
+    def on_algorithm_change(self):
+        """Refresh the recommendations and the dashboard for a new algorithm"""
+        self.update_recommendations_panel()
+        self.update_algo_label()
 
     def setup_active_session_tab(self):
         """Setup the Active Session interface"""
@@ -1537,21 +1923,22 @@ class TaskOptimizerGUI(ctk.CTk):
         
         # Header
         self.session_title = ctk.CTkLabel(tab, text="⏱️ No Active Session", 
-                                         font=ctk.CTkFont(size=24, weight="bold"))
+                                         font=self.get_font(size=24, weight="bold"))
         self.session_title.grid(row=0, column=0, padx=20, pady=(30, 10))
         
         # Timer - LARGE display
         self.timer_label = ctk.CTkLabel(tab, text="00:00:00", 
-                                       font=ctk.CTkFont(size=72, weight="bold"),
+                                       font=self.get_font(size=72, weight="bold"),
                                        text_color="#1abc9c")
         self.timer_label.grid(row=1, column=0, padx=20, pady=30)
         
         # Session Camera Feed (Secondary)
         self.session_camera_label = ctk.CTkLabel(tab, text="")
         self.session_camera_label.grid(row=2, column=0, padx=20, pady=5)
+        self.create_emotion_overlay(self.session_camera_label)
         
         self.session_emotion_label = ctk.CTkLabel(tab, text="Feeling: NEUTRAL", 
-                                                font=ctk.CTkFont(size=20, weight="bold"),
+                                                font=self.get_font(size=20, weight="bold"),
                                                 text_color="#1abc9c")
         self.session_emotion_label.grid(row=3, column=0, padx=20, pady=5)
         
@@ -1560,7 +1947,7 @@ class TaskOptimizerGUI(ctk.CTk):
         self.current_task_frame.grid(row=4, column=0, padx=20, pady=10, sticky="ew")
         
         self.active_task_name = ctk.CTkLabel(self.current_task_frame, text="Current Task: None",
-                                            font=ctk.CTkFont(size=18))
+                                            font=self.get_font(size=18))
         self.active_task_name.pack(pady=10)
         
         self.active_task_details = ctk.CTkLabel(self.current_task_frame, text="Duration: -- | Started: --",
@@ -1595,13 +1982,13 @@ class TaskOptimizerGUI(ctk.CTk):
         self.break_timer_running = False
         
         # Update UI
-        if hasattr(self, 'session_title'):
+        if self.session_title is not None:
             self.session_title.configure(text="⏱️ No Active Session")
-        if hasattr(self, 'timer_label'):
+        if self.timer_label is not None:
             self.timer_label.configure(text="00:00:00", text_color="gray")
-        if hasattr(self, 'active_task_name'):
+        if self.active_task_name is not None:
             self.active_task_name.configure(text="Current Task: None")
-        if hasattr(self, 'sidebar_status'):
+        if self.sidebar_status is not None:
             self.sidebar_status.configure(text="Status: Ready", text_color="gray")
         
         self.tabview.set("Dashboard")
@@ -1616,24 +2003,17 @@ class TaskOptimizerGUI(ctk.CTk):
         📊 Session Details:
         
         Must-Do Tasks: {len(self.todo_tasks)}
-        Mood Activities: {sum(1 for var, _ in getattr(self, 'mood_vars', [])) if hasattr(self, 'mood_vars') else 0}
+        Mood Activities: {len(self.mood_vars)}
         CSP Preferences: {len(self.csp_preferences)}
         
         Tasks with Deadlines: {sum(1 for t in self.todo_tasks if hasattr(t, 'deadline') and t.deadline)}
         Preferences with Time Constraints: {len(self.csp_preferences)}
         
-        Current Algorithm: {self.algo_label.cget('text') if hasattr(self, 'algo_label') else "CSP"}
+        Current Algorithm: {self.algo_label.cget('text') if self.algo_label is not None else "CSP"}
         Current Emotion: {self.current_emotion}
         """
         messagebox.showinfo("Session Details", details)
 
-    def run_session_loop(self):
-        """Regularly update the session state"""
-        if not self.is_session_active:
-            return
-            
-        self.after(1000, self.run_session_loop)
-
     def load_saved_data(self):
         """Load saved data from previous session"""
         if os.path.exists("last_session.pkl"):
@@ -1643,11 +2023,11 @@ class TaskOptimizerGUI(ctk.CTk):
                 
                 self.todo_tasks = data.get('todo_tasks', [])
                 self.csp_preferences = data.get('csp_preferences', [])
+                self.invalidate_pool()
+                self.rec_cache.clear()
                 
-                if hasattr(self, 'refresh_task_list'):
-                    self.refresh_task_list()
-                if hasattr(self, 'refresh_pref_list'):
-                    self.refresh_pref_list()
+                self.refresh_task_list()
+                self.refresh_pref_list()
                 
                 messagebox.showinfo("Info", "Previous session data loaded successfully!")
             except Exception as e:
@@ -1656,13 +2036,16 @@ class TaskOptimizerGUI(ctk.CTk):
     def on_closing(self):
         """Handle window closing"""
         self.monitoring = False
+        self.frame_ready.set()  # Let the monitor thread see it right away
+        if self.detector:
+            self.detector.close()
         
         # Stop all timers
         self.stop_todo_timer()
         self.stop_break_timer()
         
-        if self.camera_running:
-            self.stop_camera()
+        if self.cap:
+            self.stop_camera()  # Also releases a camera paused for a break
         
         # Save current session
         try:
@@ -1671,7 +2054,7 @@ class TaskOptimizerGUI(ctk.CTk):
                 'csp_preferences': self.csp_preferences,
             }
             with open("last_session.pkl", 'wb') as f:
-                pickle.dump(data, f)
+                pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
         except Exception as e:
             print(f"Error saving session: {e}")
         
@@ -1,18 +1,23 @@
 
-import cv2
-import streamlit as st
 import time
-from emotion_detector import EmotionDetector
 from datetime import datetime
 
 def run_live_camera_window():
     """ Runs a cv2.imshow loop for live emotion detection """
-    cap = cv2.VideoCapture(0)
-    if not cap.isOpened():
+    # OpenCV, Streamlit and the FER model are only loaded once the window is
+    # opened, so importing this module stays cheap
+    import cv2
+    import streamlit as st
+    from emotion_detector import start_camera
+    
+    # Same capture settings (small MJPG stream, one-frame buffer) and
+    # detector as the terminal optimizer
+    camera = start_camera()
+    if camera is None:
         st.error("Could not open camera.")
         return
 
-    detector = EmotionDetector()
+    cap, detector = camera
     st.toast("Camera started! Press 'q' in the window to stop.")
     
     # We need to access session state, but we can't update it safely from here if running in a thread
@@ -22,14 +27,25 @@ def run_live_camera_window():
     
     last_check_time = time.time()
     
+    # The page shows the live emotion in a placeholder, rewritten only when
+    # it changes; the full rerun at the end only happens if session state did
+    emotion_box = st.empty()
+    shown_emotion = None
+    state_changed = False
+    
     while True:
         ret, frame = cap.read()
         if not ret:
             break
             
-        # Detect emotion
+        # Detect emotion (the detector only samples a frame once per
+        # detection_interval, on its own thread, and returns the last
+        # result in between)
         current_time = time.time()
         emotion = detector.detect_emotion_from_frame(frame)
+        if emotion != shown_emotion:
+            emotion_box.markdown(f"**Live emotion:** {emotion}")
+            shown_emotion = emotion
         
         # Draw on frame
         cv2.putText(frame, f"Emotion: {emotion}", (20, 50), 
@@ -45,6 +61,7 @@ def run_live_camera_window():
                         "timestamp": datetime.now().strftime("%H:%M:%S"),
                         "emotion": emotion
                 })
+                state_changed = True
                 # We can't easily trigger the UI update while stuck in this loop
                 # But we can update the state so when they close, it's there.
             last_check_time = current_time
@@ -52,6 +69,8 @@ def run_live_camera_window():
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
             
+    detector.close()
     cap.release()
     cv2.destroyAllWindows()
-    st.rerun()
+    if state_changed:
+        st.rerun()
@@ -1,6 +1,39 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+
+# Small integer ids for emotions and resources, assigned on first use, so
+# membership tests can be done with a bitwise AND on plain ints
+EMOTION_ID = {}
+RESOURCE_ID = {}
+
+MIDNIGHT = datetime.min.time()
+NO_DEADLINE = date.max.toordinal()  # Sorts tasks without a deadline last
+TYPE_BONUS = {"must_do": 5, "mood_changer": 3}  # Other task types get 0
+
+# Everything update_cached_fields sets; rebuilt on unpickling, so not saved
+CACHED_FIELDS = frozenset((
+    'deadline_key', 'deadline_ordinal', 'sort_key_source', 'todo_sort_key',
+    'score_memo', 'emotion_fit_bits', 'has_requires', 'requires_list',
+    'required_resources', 'requires_set', 'required_bits', 'has_time',
+    'time_start', 'time_end', 'optimal_hour', 'start_ordinal', 'max_time'))
+
+def get_bits(registry, names):
+    """Return a bitset with one bit per name, registering unseen names"""
+    bits = 0
+    for name in names:
+        if name not in registry:
+            registry[name] = len(registry)
+        bits |= 1 << registry[name]
+    return bits
 
 class Task:
+    # The fields every search reads (and the scores the algorithms write,
+    # always initialized so they are read directly instead of through
+    # getattr) live in slots; __dict__ stays for everything else
+    __slots__ = ('name', 'base_priority', 'category', 'duration', 'emotion_fit',
+                 'emotion_fit_bits', 'deadline', 'task_type', 'constraints', 'score',
+                 'mrv_score', 'degree_score', 'heuristic_score', 'fitness_score',
+                 'is_preference', '__dict__')
+    
     def __init__(self, name, base_priority, category, duration, emotion_fit, 
                  deadline=None, task_type="general", conditions=None, constraints=None):
         """
@@ -17,6 +50,7 @@ class Task:
         self.deadline = deadline
         self.task_type = task_type
         self.score = 0
+        self.reset_search_scores()
         self.start_time = None
         self.created_at = datetime.now()
         
@@ -34,6 +68,115 @@ class Task:
         self.preferred_time = self.constraints.get("preferred_time", "any")
         self.energy_required = self.constraints.get("energy_required", 5)  # 1-10 scale
         
+        self.update_cached_fields()
+        
+    def __getstate__(self):
+        """Pickle slots and __dict__ together as one plain dict, without caches"""
+        state = {key: value for key, value in self.__dict__.items()
+                 if key not in CACHED_FIELDS}
+        for key in Task.__slots__[:-1]:
+            if key not in CACHED_FIELDS:
+                state[key] = getattr(self, key)
+        return state
+    
+    def __setstate__(self, state):
+        """Restore a pickled task, rebuilding cached values"""
+        # Tasks pickled with slot values arrive as (dict, slots); older
+        # pickles are a plain dict
+        if isinstance(state, tuple):
+            state, slot_state = state
+            state = dict(state or {}, **(slot_state or {}))
+        self.reset_search_scores()
+        for key, value in state.items():
+            setattr(self, key, value)
+        self.update_cached_fields()
+    
+    def reset_search_scores(self):
+        """Set the per-search scores to their defaults"""
+        self.mrv_score = 0
+        self.degree_score = 0
+        self.heuristic_score = 0
+        self.fitness_score = 0
+        self.is_preference = False
+    
+    def update_cached_fields(self):
+        """Recompute values derived from emotion_fit, constraints and deadline"""
+        # Parsed deadline, cached until the deadline string changes
+        self.deadline_key = None
+        self.deadline_ordinal = None
+        
+        # TODO ordering key, cached until the deadline or priority changes
+        self.sort_key_source = None
+        self.todo_sort_key = None
+        
+        # compute_score results keyed by everything they depend on
+        self.score_memo = {}
+        
+        # Bitsets for emotion and resource membership tests
+        self.emotion_fit_bits = get_bits(EMOTION_ID, self.emotion_fit)
+        required = self.constraints.get("requires", [])
+        self.has_requires = "requires" in self.constraints
+        self.requires_list = isinstance(required, list)
+        self.required_resources = tuple(required) if self.requires_list else (required,)
+        self.requires_set = frozenset(self.required_resources)
+        self.required_bits = get_bits(RESOURCE_ID, self.required_resources)
+        
+        # First allowed day (date or start_date) as an ordinal, None if
+        # missing or invalid
+        self.start_ordinal = None
+        start_date = self.constraints.get("date") or self.constraints.get("start_date")
+        if start_date:
+            try:
+                self.start_ordinal = datetime.strptime(start_date, "%Y-%m-%d").toordinal()
+            except (TypeError, ValueError):
+                pass
+        
+        self.max_time = self.constraints.get("max_time")  # None when unlimited
+        
+        # Flattened allowed_time window, and the hour at which it fits best
+        allowed_time = self.constraints.get("allowed_time")
+        self.has_time = isinstance(allowed_time, dict)
+        if self.has_time:
+            self.time_start = allowed_time.get("start", 0)
+            self.time_end = allowed_time.get("end", 24)
+            self.optimal_hour = allowed_time.get("optimal", (self.time_start + self.time_end) / 2)
+        else:
+            self.time_start = 0
+            self.time_end = 24
+            self.optimal_hour = None
+    
+    def get_deadline_ordinal(self):
+        """Return the deadline as a date ordinal (None if missing or invalid)"""
+        if self.deadline != self.deadline_key:
+            self.deadline_key = self.deadline
+            self.deadline_ordinal = None
+            deadline = self.deadline
+            try:
+                # C fast path for padded YYYY-MM-DD only, since newer
+                # fromisoformat also takes forms (20251231, 2025-W01-1) that
+                # "%Y-%m-%d" rejects; strptime judges everything else,
+                # including the unpadded dates (e.g. 2025-1-5) it allows
+                if (isinstance(deadline, str) and len(deadline) == 10
+                        and deadline[4] == "-" and deadline[7] == "-"):
+                    self.deadline_ordinal = date.fromisoformat(deadline).toordinal()
+                else:
+                    self.deadline_ordinal = datetime.strptime(deadline, "%Y-%m-%d").toordinal()
+            except (TypeError, ValueError):
+                pass
+        return self.deadline_ordinal
+    
+    def get_todo_sort_key(self):
+        """Return the TODO ordering key: deadline first (missing last), then higher priority"""
+        source = (self.deadline, self.base_priority)
+        if source != self.sort_key_source:
+            self.sort_key_source = source
+            # Date ordinals compare as ints; an unparseable deadline counts as
+            # none
+            deadline = self.get_deadline_ordinal()
+            self.todo_sort_key = (NO_DEADLINE if deadline is None else deadline,
+                                  -self.base_priority)
+        return self.todo_sort_key
+    
     def compute_score(self, current_emotion, current_time=None, current_energy=5, 
                      preference_bonus=0, urgency_bonus=0):
         """
@@ -45,22 +188,32 @@ class Task:
         5. Energy level match
         6. Success history
         """
+        now = datetime.now()
         if current_time is None:
-            current_time = datetime.now()
+            current_time = now
+        
+        # Algorithms score the same task under a handful of emotion / energy
+        # states, so results are memoized on every input that can change
+        # between calls: the urgency bonus follows today's date (and whether
+        # it is exactly midnight), the time bonus only the hour
+        key = (current_emotion, current_time.hour, current_energy, preference_bonus,
+               now.toordinal(), now.time() == MIDNIGHT,
+               self.base_priority, self.success_rate, self.deadline)
+        score = self.score_memo.get(key)
+        if score is not None:
+            self.score = score
+            return score
         
-        # Emotion match bonus
-        if current_emotion in self.emotion_fit:
-            emotion_bonus = 8  # High bonus for emotional match
+        # Emotion match bonus (high for a match, a penalty otherwise), tested
+        # against the emotion_fit bitset; unknown emotions match nothing
+        emotion_id = EMOTION_ID.get(current_emotion)
+        if emotion_id is not None and self.emotion_fit_bits >> emotion_id & 1:
+            emotion_bonus = 8
         else:
-            emotion_bonus = -4  # Penalty for mismatch
+            emotion_bonus = -4
         
         # Task type bonus
-        if self.task_type == "must_do":
-            type_bonus = 5
-        elif self.task_type == "mood_changer":
-            type_bonus = 3
-        else:
-            type_bonus = 0
+        type_bonus = TYPE_BONUS.get(self.task_type, 0)
         
         # Time suitability bonus
         time_bonus = self.get_time_suitability(current_time)
@@ -73,7 +226,7 @@ class Task:
         success_bonus = self.success_rate * 3
         
         # Urgency bonus (if deadline exists)
-        urgency = self.get_urgency_bonus()
+        urgency = self.get_urgency_bonus(now)
         
         self.score = (self.base_priority + 
                      emotion_bonus + 
@@ -87,14 +240,19 @@ class Task:
         # Ensure score is positive
         self.score = max(0.1, self.score)
         
+        if len(self.score_memo) >= 64:
+            self.score_memo.clear()  # Keep the memo small as the clock moves on
+        self.score_memo[key] = self.score
+        
         return self.score
     
     def get_time_suitability(self, current_time):
         """Check if current time is suitable for this task"""
         hour = current_time.hour
         
-        if "time_constraints" in self.constraints:
-            time_constraints = self.constraints["time_constraints"]
+        # The cached time_constraints is empty when there are none
+        time_constraints = self.time_constraints
+        if time_constraints:
             if "morning_only" in time_constraints and hour >= 12:
                 return -5  # Not suitable
             if "evening_only" in time_constraints and hour < 17:
@@ -114,27 +272,33 @@ class Task:
         
         return 0
     
-    def get_urgency_bonus(self):
+    def get_urgency_bonus(self, now=None):
         """Calculate bonus based on deadline proximity"""
         if not self.deadline:
             return 0
         
-        try:
-            deadline_date = datetime.strptime(self.deadline, "%Y-%m-%d")
-            days_until = (deadline_date - datetime.now()).days
-            
-            if days_until < 0:
-                return 10  # Overdue!
-            elif days_until == 0:
-                return 8   # Due today
-            elif days_until <= 2:
-                return 5   # Due in 1-2 days
-            elif days_until <= 7:
-                return 2   # Due this week
-            else:
-                return 0   # Not urgent
-        except:
+        deadline = self.get_deadline_ordinal()
+        if deadline is None:
             return 0
+        
+        if now is None:
+            now = datetime.now()
+        
+        # Whole days from now until the deadline's midnight, as
+        # (deadline midnight - now).days counts them: any time past
+        # midnight puts the deadline one more day behind
+        days_until = deadline - now.toordinal() - (now.time() != MIDNIGHT)
+        
+        if days_until < 0:
+            return 10  # Overdue!
+        elif days_until == 0:
+            return 8   # Due today
+        elif days_until <= 2:
+            return 5   # Due in 1-2 days
+        elif days_until <= 7:
+            return 2   # Due this week
+        else:
+            return 0   # Not urgent
     
     def mark_attempted(self, successful=True):
         """Update task statistics after an attempt"""
@@ -149,32 +313,25 @@ class Task:
             # Failed attempts decrease success rate
             self.success_rate = max(0.1, self.success_rate - 0.2)
     
-    def check_constraints(self, current_conditions):
+    def check_constraints(self, current_conditions, current_time=None):
         """Check if all constraints are satisfied with current conditions"""
-        if "date" in self.constraints or "start_date" in self.constraints:
-            target_date_str = self.constraints.get("date") or self.constraints.get("start_date")
-            try:
-                target_date = datetime.strptime(target_date_str, "%Y-%m-%d").date()
-                current_date = datetime.now().date()
-                if current_date < target_date:
-                    return False # Too early
-            except:
-                pass
-
-        if "requires" in self.constraints:
-            required_item = self.constraints["requires"]
-            if isinstance(required_item, list):
-                if not all(item in current_conditions.get("available_resources", []) for item in required_item):
-                    return False
-            elif required_item not in current_conditions.get("available_resources", []):
-                return False
+        # Searches pass the time they already read, so a whole filter pass
+        # sees one clock reading
+        if current_time is None:
+            current_time = datetime.now()
         
-        if "max_time" in self.constraints:
-            if self.duration > self.constraints["max_time"]:
-                return False
+        if self.start_ordinal is not None and current_time.toordinal() < self.start_ordinal:
+            return False  # Too early
+        
+        # The cached requires_set holds the required resource(s)
+        if self.has_requires and not self.requires_set.issubset(
+                current_conditions.get("available_resources", ())):
+            return False
+        
+        if self.max_time is not None and self.duration > self.max_time:
+            return False
         
         # Check time constraints
-        current_time = datetime.now()
         if not self.is_time_suitable(current_time):
             return False
         
@@ -182,20 +339,23 @@ class Task:
     
     def is_time_suitable(self, current_time):
         """Check if current time is within allowed time constraints"""
+        # Read the cached time_constraints so unconstrained tasks return at once
+        time_constraints = self.time_constraints
+        if not time_constraints:
+            return True
+        
         hour = current_time.hour
         
-        if "time_constraints" in self.constraints:
-            time_constraints = self.constraints["time_constraints"]
-            if "morning_only" in time_constraints and hour >= 12:
-                return False
-            if "evening_only" in time_constraints and hour < 17:
-                return False
-            if "office_hours" in time_constraints and (hour < 9 or hour >= 17):
+        if "morning_only" in time_constraints and hour >= 12:
+            return False
+        if "evening_only" in time_constraints and hour < 17:
+            return False
+        if "office_hours" in time_constraints and (hour < 9 or hour >= 17):
+            return False
+        if "weekends_only" in time_constraints:
+            weekday = current_time.weekday()  # 0=Monday, 6=Sunday
+            if weekday < 5:  # Monday-Friday
                 return False
-            if "weekends_only" in time_constraints:
-                weekday = current_time.weekday()  # 0=Monday, 6=Sunday
-                if weekday < 5:  # Monday-Friday
-                    return False
         
         return True
     